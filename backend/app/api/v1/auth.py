@@ -1,64 +1,97 @@
 from datetime import timedelta  # Time calculations
-from typing import Annotated  # Type hints for dependencies
+from typing import Annotated, Optional  # Type hints for dependencies
 from fastapi import APIRouter, Depends, HTTPException, status  # FastAPI components
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm  # OAuth2 utilities
-from sqlalchemy.orm import Session  # Database session
+from sqlalchemy import select  # Query construction
+from sqlalchemy.ext.asyncio import AsyncSession  # Async database session
 from jose import JWTError, jwt  # JWT handling
 
 from app.core.config import settings  # App settings
-from app.core.security import verify_password, create_access_token  # Security utils
-from app.db.session import get_db  # Database session dependency
+from app.core.security import verify_and_update_password, create_access_token  # Security utils
+from app.db.session import AsyncSessionLocal, get_async_db  # Async database sessions
 from app.models.user import User  # User model
 from app.schemas.token import Token, TokenData  # Token schemas
+from app.services.auth_cache import get_auth_cache, invalidate_user  # Verified token and user cache
 
 router = APIRouter()
 # OAuth2 scheme for token extraction from requests
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
 
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """
+    Look up a user by username
+    """
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+async def _load_user(username: str) -> Optional[dict]:
+    """
+    Fetch user columns with a short-lived session
+    """
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_username(db, username)
+        if user is None:
+            return None
+        return {column.name: getattr(user, column.name) for column in User.__table__.columns}
+
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db)
+    token: Annotated[str, Depends(oauth2_scheme)]
 ) -> User:
     """
-    Get current user from JWT token
+    Get current user from JWT token (cached, the DB is only queried on a miss)
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Decode and validate JWT token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    auth_cache = get_auth_cache()
+
+    username = auth_cache.get_username(token)
+    if username is None:
+        try:
+            # Decode and validate JWT token
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    # Get user from database
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        auth_cache.set_token(token, token_data.username, payload.get("exp"))
+
+    # Get user from cache or database
+    user_data = auth_cache.get_user(username)
+    if user_data is None:
+        user_data = await _load_user(username)
+        if user_data is None:
+            raise credentials_exception
+        auth_cache.set_user(username, user_data)
+    return User(**user_data)  # Detached copy, safe to share between requests
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible token login endpoint
     """
     # Verify username and password
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user_by_username(db, form_data.username)
+    verified, new_hash = await verify_and_update_password(form_data.password, user.hashed_password) if user else (False, None)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Stored hash uses an old bcrypt cost, upgrade it while we know the password
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        invalidate_user(user.username)
     
     # Generate JWT token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db
+from app.models.conversation import Conversation, Message
+from app.models.user import User
+from app.schemas.conversation import ConversationPage, ConversationSummary, HistoryMessage, MessagePage
+from app.services.history import get_history_writer, HistoryWriter
+from .auth import get_current_user
+
+router = APIRouter()
+
+def _encode_cursor(*values) -> str:
+    """
+    Opaque cursor holding the sort key of the last row of a page
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def _decode_cursor(cursor: str, types: tuple) -> list:
+    """
+    Sort key values of a cursor, 400 if it wasn't produced by _encode_cursor
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(type(value) is value_type for value, value_type in zip(values, types))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+@router.get("", response_model=ConversationPage)
+async def list_conversations(
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+) -> ConversationPage:
+    """
+    User's conversations, most recently updated first (keyset pagination on updated_at, id)
+    """
+    query = select(Conversation).where(Conversation.user_id == current_user.id)
+    if cursor is not None:
+        updated_at, conversation_id = _decode_cursor(cursor, (str, str))
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(or_(
+            Conversation.updated_at < updated_at,
+            and_(Conversation.updated_at == updated_at, Conversation.id < conversation_id)
+        ))
+    query = query.order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).scalars().all()
+
+    items = [ConversationSummary.model_validate(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last.updated_at.isoformat(), last.id)
+    return ConversationPage(items=items, next_cursor=next_cursor)
+
+@router.get("/stats")
+async def history_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    history: HistoryWriter = Depends(get_history_writer)
+) -> dict:
+    """
+    History writer queue and write counters
+    """
+    return history.stats()
+
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
+async def list_messages(
+    conversation_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+) -> MessagePage:
+    """
+    Messages of a conversation, oldest first (keyset pagination on message id)
+    """
+    owner = (await db.execute(select(Conversation.user_id).where(Conversation.id == conversation_id))).scalar()
+    if owner != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if cursor is not None:
+        (after_id,) = _decode_cursor(cursor, (int,))
+        query = query.where(Message.id > after_id)
+    query = query.order_by(Message.id).limit(limit + 1)
+    rows = (await db.execute(query)).scalars().all()
+
+    items = [HistoryMessage.model_validate(row) for row in rows[:limit]]
+    next_cursor = _encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return MessagePage(items=items, next_cursor=next_cursor)
@@ -1,34 +1,426 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.services.llm import get_llm_service, LLMService
-from app.schemas.llm import GenerateRequest, GenerateResponse
+from app.core.config import settings
+from app.services.model_loader import get_llm_service
+from app.services.cancellation import CancellationToken, GenerationCancelled
+from app.services.response_cache import get_response_cache, ResponseCache
+from app.services.admission import get_admission_controller, AdmissionController, AdmissionRejected
+from app.services.sessions import get_session_store, SessionStore, ChatSession
+from app.services.usage import get_usage_tracker, TokenUsage, UsageTracker
+from app.services.history import get_history_writer, HistoryWriter
+from app.schemas.llm import (
+    GenerateRequest,
+    GenerateResponse,
+    ChatSessionResponse,
+    ChatMessageRequest,
+    ChatMessageResponse,
+    BatchGenerateRequest,
+)
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 
 router = APIRouter()
 
+def _cache_key(cache: ResponseCache, kind: str, request: GenerateRequest) -> Optional[str]:
+    """
+    Response cache key for the request, None if it must not be served from cache
+    """
+    if not cache.is_cacheable(request.temperature, request.cache):
+        return None
+    return cache.make_key(
+        kind,
+        request.prompt,
+        max_length=request.max_length,
+        temperature=request.temperature,
+        top_p=request.top_p,
+        top_k=request.top_k
+    )
+
+async def _watch_disconnect(http_request: Request, cancel: CancellationToken):
+    """
+    Poll the connection and cancel generation once the client is gone
+    """
+    while not cancel.is_cancelled:
+        if await http_request.is_disconnected():
+            cancel.cancel("client disconnected")
+            return
+        await asyncio.sleep(0.5)
+
+@asynccontextmanager
+async def _cancel_on_disconnect(http_request: Request):
+    """
+    Cancellation token with the server-side deadline, also cancelled when the client disconnects
+    """
+    cancel = CancellationToken(settings.LLM_REQUEST_TIMEOUT_SECONDS or None)
+    watcher = asyncio.create_task(_watch_disconnect(http_request, cancel))
+    try:
+        yield cancel
+    finally:
+        watcher.cancel()
+
+async def _check_conversation(history: HistoryWriter, conversation_id: Optional[str], user: User):
+    """
+    Fail with 404 unless the conversation to append to belongs to the user
+    """
+    if conversation_id is not None and await history.owner_of(conversation_id) != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+
+def _save_exchange(history: HistoryWriter, user: User, request: GenerateRequest, response: str) -> Optional[str]:
+    """
+    Queue prompt and answer for the history writer, returning the conversation id
+    """
+    if not settings.HISTORY_ENABLED:
+        return None
+    return history.record_exchange(user.id, request.conversation_id, request.prompt, response)
+
+def _generation_error(e: Exception) -> HTTPException:
+    """
+    Map a generation failure to an HTTP error
+    """
+    if isinstance(e, GenerationCancelled):
+        if e.reason == "deadline exceeded":
+            return HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Generation exceeded {settings.LLM_REQUEST_TIMEOUT_SECONDS:g}s limit"
+            )
+        return HTTPException(status_code=499, detail=str(e))  # Client closed request, nobody reads this
+    return HTTPException(
+        status_code=500,
+        detail=f"Error generating response: {str(e)}"
+    )
+
 @router.post("/generate", response_model=GenerateResponse)
 async def generate_text(
     request: GenerateRequest,
+    http_request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
-    llm: LLMService = Depends(get_llm_service)
+    llm=Depends(get_llm_service),
+    cache: ResponseCache = Depends(get_response_cache),
+    admission: AdmissionController = Depends(get_admission_controller),
+    usage_tracker: UsageTracker = Depends(get_usage_tracker),
+    history: HistoryWriter = Depends(get_history_writer)
 ) -> GenerateResponse:
     """
     Generate text using the Gemma model
     """
-    try:
-        response = await llm.generate_response(
-            prompt=request.prompt,
-            max_length=request.max_length,
-            temperature=request.temperature,
-            top_p=request.top_p,
-            top_k=request.top_k
+    await _check_conversation(history, request.conversation_id, current_user)
+    cache_key = _cache_key(cache, "generate", request)
+    if cache_key is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            conversation_id = _save_exchange(history, current_user, request, cached)
+            return GenerateResponse(response=cached, conversation_id=conversation_id)
+
+    await usage_tracker.check_quota(current_user.id)
+    usage = TokenUsage()
+    # Waits for a generation slot, rejected requests get 429/503 with Retry-After
+    async with admission.admit(current_user.id, "interactive"), _cancel_on_disconnect(http_request) as cancel:
+        try:
+            response = await llm.generate_response(
+                prompt=request.prompt,
+                max_length=request.max_length,
+                temperature=request.temperature,
+                top_p=request.top_p,
+                top_k=request.top_k,
+                cancel=cancel,
+                usage=usage
+            )
+        except Exception as e:
+            raise _generation_error(e)
+        finally:
+            usage_tracker.record(current_user.id, usage)
+
+    if cache_key is not None:
+        await cache.set(cache_key, response)
+    conversation_id = _save_exchange(history, current_user, request, response)
+    return GenerateResponse(response=response, conversation_id=conversation_id)
+
+def _sse_event(data: dict, event: Optional[str] = None) -> str:
+    """
+    Format a single Server-Sent Event
+    """
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_text_stream(
+    request: GenerateRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+    llm=Depends(get_llm_service),
+    cache: ResponseCache = Depends(get_response_cache),
+    admission: AdmissionController = Depends(get_admission_controller),
+    usage_tracker: UsageTracker = Depends(get_usage_tracker),
+    history: HistoryWriter = Depends(get_history_writer)
+) -> StreamingResponse:
+    """
+    Generate text using the Gemma model, streaming tokens as Server-Sent Events
+    """
+    await _check_conversation(history, request.conversation_id, current_user)
+    cache_key = _cache_key(cache, "stream", request)
+    cached = await cache.get(cache_key) if cache_key is not None else None
+
+    # Admit before the response starts, so rejections are still real 429/503 responses
+    if cached is None:
+        await usage_tracker.check_quota(current_user.id)
+    ticket = await admission.acquire(current_user.id, "interactive") if cached is None else None
+    cancel = CancellationToken(settings.LLM_REQUEST_TIMEOUT_SECONDS or None)
+    usage = TokenUsage()
+
+    async def event_stream():
+        try:
+            if cached is not None:
+                yield _sse_event({"token": cached})  # Whole cached answer in one event
+                conversation_id = _save_exchange(history, current_user, request, cached)
+                yield _sse_event({"conversation_id": conversation_id}, event="end")
+                return
+
+            chunks = []
+            async for chunk in llm.stream_response(
+                prompt=request.prompt,
+                max_length=request.max_length,
+                temperature=request.temperature,
+                top_p=request.top_p,
+                top_k=request.top_k,
+                cancel=cancel,
+                usage=usage
+            ):
+                chunks.append(chunk)
+                yield _sse_event({"token": chunk})
+            if cache_key is not None:
+                await cache.set(cache_key, "".join(chunks))
+            conversation_id = _save_exchange(history, current_user, request, "".join(chunks).strip())
+            yield _sse_event({"conversation_id": conversation_id}, event="end")
+        except Exception as e:
+            # Headers are already sent, so report the error in-band
+            yield _sse_event({"detail": _generation_error(e).detail}, event="error")
+        finally:
+            # Client disconnects close this generator, stop decoding for it
+            cancel.cancel("client disconnected")
+            usage_tracker.record(current_user.id, usage)
+            if ticket is not None:
+                ticket.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering
+        },
+        background=BackgroundTask(ticket.release) if ticket is not None else None  # Covers streams that never started
+    )
+
+@router.post("/batch")
+async def generate_batch(
+    request: BatchGenerateRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+    llm=Depends(get_llm_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+    usage_tracker: UsageTracker = Depends(get_usage_tracker)
+) -> StreamingResponse:
+    """
+    Generate answers for many prompts in padded batches, streaming NDJSON results as batches finish
+    """
+    if not hasattr(llm, "generate_bulk"):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Batch generation is not available in worker pool mode"
+        )
+    if len(request.items) > settings.LLM_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.LLM_BULK_MAX_ITEMS} items per batch"
+        )
+
+    await usage_tracker.check_quota(current_user.id)
+    items = [item.model_dump() for item in request.items]
+    cancel = CancellationToken()
+    usage = TokenUsage()
+
+    async def result_stream():
+        completed = failed = 0
+        try:
+            # Each padded batch takes one low-priority slot, interactive requests are served in between
+            async for index, response, error in llm.generate_bulk(
+                items,
+                batch_size=settings.LLM_BULK_BATCH_SIZE,
+                admit=lambda: admission.admit(current_user.id, "batch"),
+                cancel=cancel,
+                usage=usage
+            ):
+                result = {"index": index, "id": items[index]["id"]}
+                if error is None:
+                    result["response"] = response
+                    completed += 1
+                else:
+                    result["error"] = error
+                    failed += 1
+                yield json.dumps(result) + "\n"
+        except AdmissionRejected as e:
+            yield json.dumps({"error": e.detail, "retry_after": e.retry_after}) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": _generation_error(e).detail}) + "\n"
+        finally:
+            cancel.cancel("client disconnected")
+            usage_tracker.record(current_user.id, usage)
+        yield json.dumps({"done": True, "completed": completed, "failed": failed}) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@router.get("/cache/stats")
+async def response_cache_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    cache: ResponseCache = Depends(get_response_cache)
+) -> dict:
+    """
+    Response cache hit/miss counters
+    """
+    return cache.stats()
+
+def _get_user_session(session_id: str, user: User, store: SessionStore) -> ChatSession:
+    """
+    Fetch chat session owned by the user or fail with 404
+    """
+    session = store.get(session_id, user.id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
         )
-        return GenerateResponse(response=response)
-    except Exception as e:
+    return session
+
+@router.post("/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(
+    current_user: Annotated[User, Depends(get_current_user)],
+    store: SessionStore = Depends(get_session_store)
+) -> ChatSessionResponse:
+    """
+    Start a new multi-turn chat session
+    """
+    session = store.create(current_user.id)
+    return ChatSessionResponse(session_id=session.id)
+
+@router.get("/sessions/stats")
+async def chat_session_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    store: SessionStore = Depends(get_session_store)
+) -> dict:
+    """
+    Session count and KV cache memory usage
+    """
+    return store.stats()
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
+async def read_chat_session(
+    session_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    store: SessionStore = Depends(get_session_store)
+) -> ChatSessionResponse:
+    """
+    Get chat session history
+    """
+    session = _get_user_session(session_id, current_user, store)
+    return ChatSessionResponse(session_id=session.id, messages=session.to_messages())
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_chat_session(
+    session_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    store: SessionStore = Depends(get_session_store)
+):
+    """
+    End chat session and free its cache
+    """
+    session = _get_user_session(session_id, current_user, store)
+    async with session.lock:  # Let a running turn finish first
+        store.delete(session)
+
+@router.post("/sessions/{session_id}/messages", response_model=ChatMessageResponse)
+async def send_chat_message(
+    session_id: str,
+    request: ChatMessageRequest,
+    http_request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    llm=Depends(get_llm_service),
+    store: SessionStore = Depends(get_session_store),
+    admission: AdmissionController = Depends(get_admission_controller),
+    usage_tracker: UsageTracker = Depends(get_usage_tracker),
+    history: HistoryWriter = Depends(get_history_writer)
+) -> ChatMessageResponse:
+    """
+    Send a message in a chat session, only the new message gets prefilled
+    """
+    if not hasattr(llm, "generate_chat_turn"):
         raise HTTPException(
-            status_code=500,
-            detail=f"Error generating response: {str(e)}"
-        ) 
\ No newline at end of file
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Chat sessions are not available in worker pool mode"
+        )
+
+    session = _get_user_session(session_id, current_user, store)
+    await usage_tracker.check_quota(current_user.id)
+    usage = TokenUsage()
+    async with session.lock, admission.admit(current_user.id, "interactive"), _cancel_on_disconnect(http_request) as cancel:
+        try:
+            response = await llm.generate_chat_turn(
+                session,
+                store,
+                message=request.message,
+                max_length=request.max_length,
+                temperature=request.temperature,
+                top_p=request.top_p,
+                top_k=request.top_k,
+                cancel=cancel,
+                usage=usage
+            )
+        except Exception as e:
+            raise _generation_error(e)
+        finally:
+            usage_tracker.record(current_user.id, usage)
+
+    # The session id doubles as the conversation id in the history
+    if settings.HISTORY_ENABLED:
+        if len(session.history) == 1:
+            history.start_conversation(current_user.id, request.message, session.id)
+        history.record_exchange(current_user.id, session.id, request.message, response)
+    return ChatMessageResponse(session_id=session.id, response=response)
+
+@router.get("/usage")
+async def token_usage(
+    current_user: Annotated[User, Depends(get_current_user)],
+    usage_tracker: UsageTracker = Depends(get_usage_tracker)
+) -> dict:
+    """
+    Tokens used today and the remaining daily quota
+    """
+    return await usage_tracker.user_stats(current_user.id)
+
+@router.get("/queue")
+async def generation_queue_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    admission: AdmissionController = Depends(get_admission_controller)
+) -> dict:
+    """
+    Generation slots, queue depth and current wait estimate
+    """
+    return admission.stats()
+
+@router.get("/speculation")
+async def speculation_stats(
+    current_user: Annotated[User, Depends(get_current_user)],
+    llm=Depends(get_llm_service)
+) -> dict:
+    """
+    Speculative decoding mode and draft acceptance rate
+    """
+    if not hasattr(llm, "speculation_stats"):
+        return {"mode": settings.LLM_SPECULATIVE_MODE, "detail": "Statistics are kept by the pool workers"}
+    return llm.speculation_stats()
\ No newline at end of file
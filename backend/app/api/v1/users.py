@@ -1,22 +1,22 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash
-from app.db.session import get_db
+from app.core.security import hash_password
+from app.db.session import get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate, User as UserSchema
-from .auth import get_current_user
+from .auth import get_current_user, get_user_by_username
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register new user endpoint
     """
     # Check for existing user
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,11 +24,11 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user with hashed password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = User(username=user.username, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.get("/me", response_model=UserSchema)
@@ -1,5 +1,4 @@
 from pydantic_settings import BaseSettings  # Settings management
-from typing import Optional  # Type hints
 from dotenv import load_dotenv  # Environment variables
 import os  # OS utilities
 
@@ -15,9 +14,25 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Hashes with another cost are upgraded on login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))  # Hashing threads, 0 = one per CPU core
+
+    # Cache of verified tokens and user records (skips JWT decoding and the DB on authenticated requests)
+    AUTH_CACHE_ENABLED: bool = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))  # Never past the token's exp
     
     # Database configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # Empty = DATABASE_URL with its async driver
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))  # Persistent connections (MySQL)
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # Extra connections under burst load
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reconnect before MySQL wait_timeout drops it
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Test connections on checkout
+    DB_CREATE_SCHEMA: bool = os.getenv("DB_CREATE_SCHEMA", "true").lower() == "true"  # Create tables at startup (off when migrated separately)
 
     # LLM configuration
     SYSTEM_PROMPT: str = os.getenv("SYSTEM_PROMPT", """You are a Practical AI Mentor, guiding individuals through learning, skill development, and helping them "reboot" their thinking patterns for enhanced problem-solving and personal growth.
@@ -88,6 +103,91 @@ Context & Limitations:
    - Focus on clear, actionable advice
    - Acknowledge scope limitations""")
 
+    # Local model directory
+    LLM_MODEL_PATH: str = os.getenv("LLM_MODEL_PATH", os.path.join(os.getcwd(), "models", "gemma-3-4b-it"))
+
+    # Inference engine: transformers (eager PyTorch), onnxruntime (exported model with KV cache) or stub (no model, for tests)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "transformers")
+    LLM_ONNX_MODEL_PATH: str = os.getenv("LLM_ONNX_MODEL_PATH", os.path.join(os.getcwd(), "models", "gemma-3-4b-it-onnx"))
+    LLM_ONNX_MODEL_FILE: str = os.getenv("LLM_ONNX_MODEL_FILE", "model.onnx")
+    LLM_STUB_TOKEN_DELAY_MS: float = float(os.getenv("LLM_STUB_TOKEN_DELAY_MS", "0"))  # Simulated time per generated token
+
+    # Load and warm up the model in the background on startup
+    LLM_PRELOAD: bool = os.getenv("LLM_PRELOAD", "true").lower() == "true"
+    LLM_WARMUP_ENABLED: bool = os.getenv("LLM_WARMUP_ENABLED", "true").lower() == "true"
+
+    # CPU precision mode: float32, bfloat16 or int8 (dynamic quantization of Linear layers)
+    LLM_PRECISION: str = os.getenv("LLM_PRECISION", "float32")
+    LLM_SELF_CHECK: bool = os.getenv("LLM_SELF_CHECK", "true").lower() == "true"  # Memory/speed report on startup
+    # Speculative decoding: off, draft (small assistant model) or prompt_lookup (n-gram, draft-free); bypasses the KV caches
+    # Speculative decoding: off, draft (small assistant model) or prompt_lookup (n-gram, draft-free)
+    LLM_SPECULATIVE_MODE: str = os.getenv("LLM_SPECULATIVE_MODE", "off")
+    LLM_DRAFT_MODEL_PATH: str = os.getenv("LLM_DRAFT_MODEL_PATH", os.path.join(os.getcwd(), "models", "gemma-3-1b-it"))
+    LLM_PROMPT_LOOKUP_TOKENS: int = int(os.getenv("LLM_PROMPT_LOOKUP_TOKENS", "10"))  # Candidates per lookup
+
+    # Token budget of prompt + generated tokens; long user input and old chat turns are trimmed, the system prompt never is
+    LLM_CONTEXT_TOKENS: int = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+
+    # Reuse the KV cache of the system prompt across requests
+    LLM_PREFIX_CACHE_ENABLED: bool = os.getenv("LLM_PREFIX_CACHE_ENABLED", "true").lower() == "true"
+
+    # Chat sessions with retained KV caches
+    LLM_SESSION_CACHE_BUDGET_MB: float = float(os.getenv("LLM_SESSION_CACHE_BUDGET_MB", "2048"))  # All session caches together
+    LLM_SESSION_CACHE_IDLE_SECONDS: float = float(os.getenv("LLM_SESSION_CACHE_IDLE_SECONDS", "600"))  # Drop cache after idling
+    LLM_SESSION_TTL_SECONDS: float = float(os.getenv("LLM_SESSION_TTL_SECONDS", "3600"))  # Forget session after idling
+    LLM_MAX_SESSIONS: int = int(os.getenv("LLM_MAX_SESSIONS", "1000"))
+    LLM_MAX_SESSIONS_PER_USER: int = int(os.getenv("LLM_MAX_SESSIONS_PER_USER", "20"))  # Oldest own session is replaced beyond this
+
+    # Server-side wall-clock limit for a single generation (0 disables)
+    LLM_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+
+    # Request batching configuration
+    LLM_BATCHING_ENABLED: bool = os.getenv("LLM_BATCHING_ENABLED", "false").lower() == "true"
+    LLM_MAX_BATCH_SIZE: int = int(os.getenv("LLM_MAX_BATCH_SIZE", "4"))  # Requests decoded together
+    LLM_BATCH_WINDOW_MS: float = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))  # Time to wait for more requests
+
+    # CPU threading: cores are split between concurrent generation slots
+    LLM_GENERATION_SLOTS: int = int(os.getenv("LLM_GENERATION_SLOTS", "0"))  # Concurrent generations per process, 0 = 1 with batching, else 2
+    LLM_THREADS_PER_SLOT: int = int(os.getenv("LLM_THREADS_PER_SLOT", "0"))  # Torch intra-op threads per slot, 0 = cores / slots
+    LLM_INTEROP_THREADS: int = int(os.getenv("LLM_INTEROP_THREADS", "1"))  # Torch inter-op threads per process
+    LLM_PIN_THREADS: bool = os.getenv("LLM_PIN_THREADS", "false").lower() == "true"  # Pin each slot to its own cores
+    LLM_THREADS_USE_SMT: bool = os.getenv("LLM_THREADS_USE_SMT", "false").lower() == "true"  # Count hyperthreads as cores
+
+    # Bulk generation (/llm/batch)
+    LLM_BULK_BATCH_SIZE: int = int(os.getenv("LLM_BULK_BATCH_SIZE", "8"))  # Prompts decoded together
+    LLM_BULK_MAX_ITEMS: int = int(os.getenv("LLM_BULK_MAX_ITEMS", "1000"))  # Prompts per request
+
+    # Inference worker pool (python -m app.services.worker_pool)
+    LLM_WORKER_POOL_ENABLED: bool = os.getenv("LLM_WORKER_POOL_ENABLED", "false").lower() == "true"  # API forwards to the pool
+    LLM_WORKER_POOL_SIZE: int = int(os.getenv("LLM_WORKER_POOL_SIZE", "2"))  # Inference processes
+    LLM_WORKER_POOL_HOST: str = os.getenv("LLM_WORKER_POOL_HOST", "127.0.0.1")
+    LLM_WORKER_POOL_PORT: int = int(os.getenv("LLM_WORKER_POOL_PORT", "50055"))
+    LLM_WORKER_POOL_AUTHKEY: str = os.getenv("LLM_WORKER_POOL_AUTHKEY", "")  # Shared secret, required: the socket accepts pickles
+
+    # Response cache for repeated prompts
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "local")  # local or redis
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Per-user token accounting
+    USAGE_DAILY_TOKEN_QUOTA: int = int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "0"))  # Prompt + completion tokens per UTC day, 0 = unlimited
+    USAGE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("USAGE_FLUSH_INTERVAL_SECONDS", "10"))  # Write-behind period
+
+    # Conversation history (written in batches off the request path)
+    HISTORY_ENABLED: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "200"))  # Records per write transaction
+    HISTORY_FLUSH_INTERVAL_MS: float = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))  # Max delay before a write
+    HISTORY_MAX_QUEUE: int = int(os.getenv("HISTORY_MAX_QUEUE", "10000"))  # Pending records before new ones are dropped
+
+    # Admission control in front of generation
+    ADMISSION_SLOTS: int = int(os.getenv("ADMISSION_SLOTS", "0"))  # Concurrent generations, 0 = derive from LLM settings
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))  # Waiting requests before 503
+    ADMISSION_PER_USER_LIMIT: int = int(os.getenv("ADMISSION_PER_USER_LIMIT", "2"))  # Running + queued per user before 429
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+    ADMISSION_INITIAL_SERVICE_SECONDS: float = float(os.getenv("ADMISSION_INITIAL_SERVICE_SECONDS", "20"))  # Until measured
+
     class Config:
         env_file = ".env"  # Environment file path
         env_file_encoding = "utf-8"  # Environment file encoding
@@ -0,0 +1,115 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest  # Prometheus metric types
+from fastapi import Response  # /metrics response
+from sqlalchemy import event  # Query timing hooks
+import time  # Query timing
+
+# Seconds, from fast DB queries up to long generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+RATE_BUCKETS = (0.5, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# Generation pipeline
+QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time a generation waited before running (admission queue, batch window, executor)",
+    ["queue"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    "llm_stage_seconds",
+    "Time spent per generation stage (tokenize, prefill, decode, detokenize)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Prompt length in tokens", buckets=TOKEN_BUCKETS)
+GENERATED_TOKENS = Histogram("llm_generated_tokens", "Generated tokens per request", buckets=TOKEN_BUCKETS)
+DECODE_TOKENS_PER_SECOND = Histogram("llm_decode_tokens_per_second", "Decode speed per request", buckets=RATE_BUCKETS)
+PROMPT_TRIMMED_TOKENS = Counter("llm_prompt_trimmed_tokens", "User and history tokens dropped to fit the context budget")
+
+# Generation thread pool
+EXECUTOR_THREADS = Gauge("llm_executor_threads", "Threads in the generation executor")
+EXECUTOR_BUSY = Gauge("llm_executor_busy_threads", "Executor threads currently running a task")
+EXECUTOR_QUEUED = Gauge("llm_executor_queued_tasks", "Tasks waiting for a free executor thread")
+
+# Database and HTTP
+DB_QUERY_DURATION = Histogram("db_query_seconds", "Database query latency", ["operation"], buckets=LATENCY_BUCKETS)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency until response headers, per route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+def record_generation(prompt_tokens: int, generated_tokens: int, prefill_seconds: float, decode_seconds: float):
+    """
+    Record token counts and prefill/decode split of one finished generation
+    """
+    STAGE_DURATION.labels("prefill").observe(prefill_seconds)
+    STAGE_DURATION.labels("decode").observe(decode_seconds)
+    PROMPT_TOKENS.observe(prompt_tokens)
+    GENERATED_TOKENS.observe(generated_tokens)
+    if generated_tokens > 1 and decode_seconds > 0:
+        DECODE_TOKENS_PER_SECOND.observe((generated_tokens - 1) / decode_seconds)  # First token comes from prefill
+
+def instrument_engine(engine):
+    """
+    Observe every query executed through the engine
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_DURATION.labels(operation).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def abandon_query(exception_context):
+        # Failed statements never reach after_cursor_execute, drop their start time
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+class RequestLatencyMiddleware:
+    """
+    Per-route latency until response headers, as plain ASGI so streaming and disconnects pass through untouched
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status_code: int):
+            nonlocal recorded
+            recorded = True
+            # Labelled by route template so path parameters don't explode cardinality
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not recorded:
+                record(500)  # Failed before sending headers
+
+def metrics_response() -> Response:
+    """
+    Current metrics in Prometheus text format
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
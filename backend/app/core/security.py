@@ -1,11 +1,26 @@
 from datetime import datetime, timedelta  # Time utilities
-from typing import Optional  # Type hints
-from jose import JWTError, jwt  # JWT handling
+from typing import Optional, Tuple  # Type hints
+from concurrent.futures import ThreadPoolExecutor  # Dedicated hashing pool
+from jose import jwt  # JWT handling
 from passlib.context import CryptContext  # Password hashing
 from app.core.config import settings  # App settings
+import asyncio  # For async operations
+import os  # CPU count
 
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing configuration; min = max = default cost, so any other cost needs an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a thread per core scales hashing without blocking the event loop
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -37,4 +52,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM
     )
-    return encoded_jwt 
\ No newline at end of file
+    return encoded_jwt 
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify password in the hashing pool; also returns a new hash if the stored one uses an outdated cost
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """
+    Generate password hash in the hashing pool
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.hash, password)
@@ -0,0 +1,36 @@
+from contextlib import contextmanager  # Phase timing blocks
+from typing import List, Tuple  # For type hints
+import time  # Phase timing
+
+class StartupReport:
+    """
+    Time spent in each startup phase, printed once the app is up and served by /startup
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def log(self):
+        print(f"Startup finished in {time.perf_counter() - self.started:.3f}s")
+        for name, seconds in self.phases:
+            print(f"  {name:<24}{seconds:.3f}s")
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases},
+            "total_seconds": round(sum(seconds for _, seconds in self.phases), 4),
+        }
+
+# Created on first import, i.e. as early as possible in main.py
+startup_report = StartupReport()
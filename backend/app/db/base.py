@@ -8,4 +8,6 @@ Base: DeclarativeMeta = declarative_base()
 from app.db.base_class import Base  # SQLAlchemy declarative base
 
 # Import all models to ensure they are registered with SQLAlchemy
-from app.models.user import User  # User model 
\ No newline at end of file
+from app.models.user import User  # User model 
+from app.models.usage import Usage  # Daily token usage model
+from app.models.conversation import Conversation, Message  # Conversation history models
@@ -0,0 +1,15 @@
+"""
+Create database tables: python -m app.db.init_db
+"""
+from app.db.base import Base  # Declarative base with all models registered
+from app.db.session import engine  # Database engine
+
+def init_db():
+    """
+    Create missing tables (existing ones are left untouched)
+    """
+    Base.metadata.create_all(bind=engine)
+
+if __name__ == "__main__":
+    init_db()
+    print("Database schema is up to date")
@@ -1,16 +1,55 @@
 from sqlalchemy import create_engine  # Database engine
+from sqlalchemy.engine import make_url  # URL parsing
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # Async engine and sessions
 from sqlalchemy.orm import sessionmaker  # Session factory
 from app.core.config import settings  # App settings
+from app.core.metrics import instrument_engine  # Query latency metrics
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite specific
-)
+# Async driver for each supported database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_database_url() -> str:
+    """
+    ASYNC_DATABASE_URL, or DATABASE_URL switched to its async driver
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+def engine_options(url: str) -> dict:
+    """
+    SQLite needs cross-thread access, server databases get a sized, self-healing pool
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}  # SQLite specific
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+# Create SQLAlchemy engine (schema creation and sync code)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API, so DB I/O doesn't block the event loop
+async_database_url = get_async_database_url()
+async_engine = create_async_engine(async_database_url, **engine_options(async_database_url))
+instrument_engine(async_engine.sync_engine)
+
+# Async session factory; objects stay usable after commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     """
     Database session dependency
@@ -19,4 +58,11 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """
+    Async database session dependency
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,35 @@
+from datetime import datetime, timezone  # Timestamps
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text  # SQLAlchemy column types
+from app.db.base_class import Base  # SQLAlchemy declarative base
+
+class Conversation(Base):
+    """
+    Conversation with the mentor, owned by a user
+    """
+    __tablename__ = "conversations"  # Database table name
+    __table_args__ = (
+        Index("ix_conversations_user_updated", "user_id", "updated_at", "id"),  # Keyset pagination per user
+    )
+
+    # Conversation attributes
+    id = Column(String(32), primary_key=True)  # uuid4 hex, assigned by the API before the row is written
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Owner
+    title = Column(String(200), nullable=False, default="")  # Start of the first prompt
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))  # Time of the last message
+
+class Message(Base):
+    """
+    Single message of a conversation
+    """
+    __tablename__ = "messages"  # Database table name
+    __table_args__ = (
+        Index("ix_messages_conversation_id", "conversation_id", "id"),  # Keyset pagination per conversation
+    )
+
+    # Message attributes
+    id = Column(Integer, primary_key=True)  # Insertion order
+    conversation_id = Column(String(32), ForeignKey("conversations.id"), nullable=False)
+    role = Column(String(16), nullable=False)  # user or model
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
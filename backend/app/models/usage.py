@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, UniqueConstraint  # SQLAlchemy column types
+from app.db.base_class import Base  # SQLAlchemy declarative base
+
+class Usage(Base):
+    """
+    Generation usage of a user for one day (UTC)
+    """
+    __tablename__ = "usage"  # Database table name
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_usage_user_day"),)
+
+    # Usage attributes
+    id = Column(Integer, primary_key=True, index=True)  # Primary key
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)  # Owner
+    day = Column(Date, index=True, nullable=False)  # UTC date
+    prompt_tokens = Column(Integer, nullable=False, default=0)  # Tokens fed to the model
+    completion_tokens = Column(Integer, nullable=False, default=0)  # Tokens generated
+    requests = Column(Integer, nullable=False, default=0)  # Generations counted
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class ConversationSummary(BaseModel):
+    id: str = Field(..., description="Conversation identifier")
+    title: str = Field(..., description="Start of the first prompt")
+    created_at: datetime
+    updated_at: datetime = Field(..., description="Time of the last message")
+
+    class Config:
+        from_attributes = True
+
+class ConversationPage(BaseModel):
+    items: List[ConversationSummary] = Field(default_factory=list, description="Most recently updated first")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page, null on the last page")
+
+class HistoryMessage(BaseModel):
+    id: int = Field(..., description="Message identifier")
+    role: str = Field(..., description="Message author: user or model")
+    content: str = Field(..., description="Message text")
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MessagePage(BaseModel):
+    items: List[HistoryMessage] = Field(default_factory=list, description="Oldest first")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page, null on the last page")
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 class GenerateRequest(BaseModel):
@@ -6,6 +7,39 @@ class GenerateRequest(BaseModel):
     temperature: float = Field(0.7, ge=0.0, le=1.0, description="Sampling temperature")
     top_p: float = Field(0.95, ge=0.0, le=1.0, description="Nucleus sampling parameter")
     top_k: int = Field(50, ge=0, description="Top-k sampling parameter")
+    cache: bool = Field(False, description="Allow cached responses for sampled (temperature > 0) requests")
+    conversation_id: Optional[str] = Field(None, description="Conversation to append to, a new one is started if omitted")
 
 class GenerateResponse(BaseModel):
-    response: str = Field(..., description="Generated response from the model") 
\ No newline at end of file
+    response: str = Field(..., description="Generated response from the model") 
+    conversation_id: Optional[str] = Field(None, description="Conversation the exchange was saved to")
+
+class ChatMessage(BaseModel):
+    role: str = Field(..., description="Message author: user or model")
+    content: str = Field(..., description="Message text")
+
+class ChatSessionResponse(BaseModel):
+    session_id: str = Field(..., description="Chat session identifier")
+    messages: List[ChatMessage] = Field(default_factory=list, description="Conversation so far")
+
+class ChatMessageRequest(BaseModel):
+    message: str = Field(..., description="New user message")
+    max_length: int = Field(512, description="Maximum length of generated text")
+    temperature: float = Field(0.7, ge=0.0, le=1.0, description="Sampling temperature")
+    top_p: float = Field(0.95, ge=0.0, le=1.0, description="Nucleus sampling parameter")
+    top_k: int = Field(50, ge=0, description="Top-k sampling parameter")
+
+class ChatMessageResponse(BaseModel):
+    session_id: str = Field(..., description="Chat session identifier")
+    response: str = Field(..., description="Model answer to the message")
+
+class BatchGenerateItem(BaseModel):
+    id: Optional[str] = Field(None, description="Client identifier echoed back in the result")
+    prompt: str = Field(..., description="Input prompt for the model")
+    max_length: int = Field(512, description="Maximum length of generated text")
+    temperature: float = Field(0.7, ge=0.0, le=1.0, description="Sampling temperature")
+    top_p: float = Field(0.95, ge=0.0, le=1.0, description="Nucleus sampling parameter")
+    top_k: int = Field(50, ge=0, description="Top-k sampling parameter")
+
+class BatchGenerateRequest(BaseModel):
+    items: List[BatchGenerateItem] = Field(..., min_length=1, description="Prompts with per-item parameters")
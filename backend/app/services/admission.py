@@ -0,0 +1,172 @@
+from contextlib import asynccontextmanager  # admit() context manager
+from typing import Dict, List, Optional  # For type hints
+from app.core.config import settings  # Admission limits
+from app.core import metrics  # Queue wait histogram
+from app.services.threading_policy import generation_slots  # Generations run at once per process
+import asyncio  # For async operations
+import heapq  # Priority queue of waiters
+import itertools  # FIFO order within a priority class
+import math  # Retry-After rounding
+import time  # Service time measurement
+
+# Lower value is served first
+PRIORITY_CLASSES = {
+    "interactive": 0,  # Single generations, streams and chat turns
+    "batch": 1,  # Bulk/offline workloads
+}
+
+class AdmissionRejected(Exception):
+    """
+    Request was not admitted; carries HTTP status and a Retry-After estimate
+    """
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class AdmissionTicket:
+    """
+    Held generation slot; release() is idempotent
+    """
+    def __init__(self, controller: "AdmissionController", user_id: int):
+        self.controller = controller
+        self.user_id = user_id
+        self.started_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+class AdmissionController:
+    """
+    Bounded priority queue in front of generation with per-user concurrency limits
+    """
+    def __init__(self, slots: int, max_queue: int, per_user_limit: int, queue_timeout: float):
+        self.slots = slots  # Generations allowed to run at once
+        self.max_queue = max_queue
+        self.per_user_limit = per_user_limit  # Running + queued requests per user
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.waiters: List[tuple] = []  # (priority, sequence, future)
+        self.sequence = itertools.count()
+        self.user_requests: Dict[int, int] = {}
+        self.avg_service_seconds = settings.ADMISSION_INITIAL_SERVICE_SECONDS  # EWMA of slot hold time
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self, ahead: Optional[int] = None) -> int:
+        """
+        Seconds until a new request would likely get a slot, from current throughput
+        """
+        ahead = self.queued if ahead is None else ahead
+        return max(1, math.ceil((ahead + 1) * self.avg_service_seconds / max(self.slots, 1)))
+
+    async def acquire(self, user_id: int, priority: str = "interactive") -> AdmissionTicket:
+        """
+        Wait for a generation slot or raise AdmissionRejected
+        """
+        if self.user_requests.get(user_id, 0) >= self.per_user_limit:
+            self.rejected += 1
+            raise AdmissionRejected(429, "Too many concurrent requests for this user", self.retry_after())
+        if self.active >= self.slots and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(503, "Generation queue is full", self.retry_after())
+
+        self.user_requests[user_id] = self.user_requests.get(user_id, 0) + 1
+        ticket = AdmissionTicket(self, user_id)
+        if self.active < self.slots and self.queued == 0:
+            self.active += 1
+            metrics.QUEUE_WAIT.labels("admission").observe(0)
+            return ticket
+
+        waiter = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.waiters, (PRIORITY_CLASSES[priority], next(self.sequence), waiter))
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                ticket.release()  # Slot was handed over just as we gave up, pass it on
+            else:
+                self.queued -= 1
+                self._forget_user(user_id)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise AdmissionRejected(503, "Timed out waiting for a generation slot", self.retry_after())
+            raise
+
+        metrics.QUEUE_WAIT.labels("admission").observe(time.monotonic() - ticket.started_at)
+        ticket.started_at = time.monotonic()
+        return ticket
+
+    @asynccontextmanager
+    async def admit(self, user_id: int, priority: str = "interactive"):
+        """
+        Hold a generation slot for the duration of the block
+        """
+        ticket = await self.acquire(user_id, priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _release(self, ticket: AdmissionTicket):
+        # Track how long a slot is held to estimate throughput
+        held = time.monotonic() - ticket.started_at
+        self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * held
+        self._forget_user(ticket.user_id)
+
+        # Hand the slot directly to the best waiting request
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                self.queued -= 1
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def _forget_user(self, user_id: int):
+        remaining = self.user_requests.get(user_id, 0) - 1
+        if remaining > 0:
+            self.user_requests[user_id] = remaining
+        else:
+            self.user_requests.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "avg_service_seconds": round(self.avg_service_seconds, 2),
+            "estimated_wait_seconds": self.retry_after(),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+# Global admission controller
+admission_controller: Optional[AdmissionController] = None
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Get or create admission controller instance (singleton pattern)
+    """
+    global admission_controller
+    if admission_controller is None:
+        slots = settings.ADMISSION_SLOTS
+        if slots <= 0:
+            # Enough in flight to fill a batch, otherwise one per executor thread
+            slots = settings.LLM_MAX_BATCH_SIZE if settings.LLM_BATCHING_ENABLED else generation_slots()
+            if settings.LLM_WORKER_POOL_ENABLED:
+                slots *= settings.LLM_WORKER_POOL_SIZE
+        admission_controller = AdmissionController(
+            slots=slots,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            per_user_limit=settings.ADMISSION_PER_USER_LIMIT,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        )
+    return admission_controller
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import Optional  # For type hints
+from app.core.cache import TTLCache  # Bounded TTL + LRU cache
+from app.core.config import settings  # Cache limits
+import time  # Token expiry
+
+class AuthCache:
+    """
+    Verified tokens and user records, so authenticated requests skip JWT decoding and the DB
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.tokens = TTLCache(max_entries, ttl_seconds)  # token -> username
+        self.users = TTLCache(max_entries, ttl_seconds)  # username -> user column values
+        self.hits = 0
+        self.misses = 0
+
+    def get_username(self, token: str) -> Optional[str]:
+        """
+        Username of an already verified, unexpired token
+        """
+        return self.tokens.get(token)
+
+    def set_token(self, token: str, username: str, expires_at: Optional[float]):
+        """
+        Remember a verified token until its exp claim at the latest
+        """
+        ttl = expires_at - time.time() if expires_at is not None else None
+        self.tokens.set(token, username, ttl)
+
+    def get_user(self, username: str) -> Optional[dict]:
+        user = self.users.get(username)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set_user(self, username: str, user: dict):
+        self.users.set(username, user)
+
+    def invalidate_user(self, username: str):
+        """
+        Forget a user's record after it changed; the next request reloads it from the DB
+        """
+        self.users.delete(username)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.AUTH_CACHE_ENABLED,
+            "tokens": len(self.tokens),
+            "users": len(self.users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Global auth cache instance
+auth_cache: Optional[AuthCache] = None
+
+def get_auth_cache() -> AuthCache:
+    """
+    Get or create auth cache instance (singleton pattern)
+    """
+    global auth_cache
+    if auth_cache is None:
+        # A zero TTL keeps nothing, so a disabled cache always misses
+        ttl_seconds = settings.AUTH_CACHE_TTL_SECONDS if settings.AUTH_CACHE_ENABLED else 0
+        auth_cache = AuthCache(settings.AUTH_CACHE_MAX_ENTRIES, ttl_seconds)
+    return auth_cache
+
+def invalidate_user(username: str):
+    """
+    Hook for code that changes or deletes a user
+    """
+    get_auth_cache().invalidate_user(username)
@@ -0,0 +1,25 @@
+from typing import Callable, List, Optional  # For type hints
+
+# Inference engines selectable with LLM_BACKEND; each is imported only when chosen
+BACKENDS = ("transformers", "onnxruntime", "stub")
+
+def create_backend(
+    name: str,
+    on_progress: Optional[Callable[[str, float], None]] = None,
+    cpu_cores: Optional[List[int]] = None,
+    mmap_weights_path: Optional[str] = None
+):
+    """
+    Load the named inference backend
+    """
+    name = name.lower()
+    if name == "transformers":
+        from app.services.llm import LLMService  # torch/transformers are only imported here
+        return LLMService(mmap_weights_path=mmap_weights_path, on_progress=on_progress, cpu_cores=cpu_cores)
+    if name == "onnxruntime":
+        from app.services.backends.onnx_runtime import OnnxRuntimeBackend
+        return OnnxRuntimeBackend(on_progress=on_progress, cpu_cores=cpu_cores)
+    if name == "stub":
+        from app.services.backends.stub import StubBackend
+        return StubBackend(on_progress=on_progress, cpu_cores=cpu_cores)
+    raise ValueError(f"Unsupported LLM_BACKEND '{name}', expected one of {list(BACKENDS)}")
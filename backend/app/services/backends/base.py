@@ -0,0 +1,357 @@
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple  # For type hints
+from contextlib import nullcontext  # No-op admission for bulk runs
+from concurrent.futures import ThreadPoolExecutor  # Generation slots
+from app.core.config import settings  # System prompt and context budget
+from app.core import metrics  # Stage latency and token metrics
+from app.services.cancellation import CancellationToken, GenerationCancelled  # Early stop
+from app.services.prompt_builder import PromptBuilder  # Token-budgeted chat template
+from app.services.threading_policy import generation_slots, plan_layout  # CPU split between generations
+from app.services.usage import TokenUsage  # Per-request token accounting
+import numpy as np  # Logits and sampling
+import asyncio  # For async operations
+import time  # Stage timing
+
+REPETITION_PENALTY = 1.2  # Same penalty the transformers backend passes to generate()
+
+def strip_chat_template(text: str) -> str:
+    """
+    Keep only the model turn of a decoded prompt + answer
+    """
+    turns = text.split("<start_of_turn>")
+    for turn in turns:
+        if turn.startswith("model"):
+            text = turn.replace("model", "").strip()
+            break
+    return text.split("<end_of_turn>")[0].strip()
+
+class InferenceBackend:
+    """
+    Interface the API layer talks to; a backend loads its model in __init__ (see create_backend)
+
+    Required: warm_up, generate_response, stream_response and generate_bulk. Optional:
+    generate_chat_turn, the API answers 501 without it
+    """
+    name = "base"
+    executor: ThreadPoolExecutor
+
+    def warm_up(self):
+        raise NotImplementedError
+
+    async def generate_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    def stream_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    def generate_bulk(
+        self,
+        items: List[dict],
+        batch_size: int,
+        admit: Optional[Callable] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+        raise NotImplementedError
+
+    def speculation_stats(self) -> dict:
+        return {"mode": "off"}
+
+    def _run_in_executor(self, fn: Callable, *args) -> asyncio.Future:
+        """
+        Run fn in the generation thread pool, tracking queue wait and busy threads
+        """
+        submitted = time.perf_counter()
+        metrics.EXECUTOR_QUEUED.inc()
+
+        def run():
+            metrics.EXECUTOR_QUEUED.dec()
+            metrics.QUEUE_WAIT.labels("executor").observe(time.perf_counter() - submitted)
+            with metrics.EXECUTOR_BUSY.track_inprogress():
+                return fn(*args)
+
+        return asyncio.get_event_loop().run_in_executor(self.executor, run)
+
+    def __del__(self):
+        """
+        Cleanup resources on deletion
+        """
+        if hasattr(self, 'executor'):
+            self.executor.shutdown(wait=True)
+
+class TokenLoopBackend(InferenceBackend):
+    """
+    Backend decoding one token per step in Python; subclasses provide the tokenizer and _prefill/_forward
+    """
+    no_repeat_ngram_size = 3  # Same n-gram ban the transformers backend passes to generate(), 0 disables it
+
+    def __init__(self, tokenizer, stop_token_ids: List[int], context_tokens: int, cpu_cores: Optional[List[int]] = None):
+        self.tokenizer = tokenizer
+        self.stop_token_ids = set(stop_token_ids)
+        self.prompt_builder = PromptBuilder(tokenizer, lambda: settings.SYSTEM_PROMPT, context_tokens)
+        self.thread_layout = plan_layout(generation_slots(), cpu_cores)
+        self.executor = ThreadPoolExecutor(max_workers=self.thread_layout.slots, thread_name_prefix="llm-slot")
+        metrics.EXECUTOR_THREADS.set(self.thread_layout.slots)
+
+    def _prefill(self, input_ids: List[int]) -> Tuple[object, np.ndarray]:
+        """
+        Process the prompt, returning the decode state and next-token logits
+        """
+        raise NotImplementedError
+
+    def _forward(self, state, token_id: int) -> Tuple[object, np.ndarray]:
+        """
+        Feed one generated token, returning the new state and next-token logits
+        """
+        raise NotImplementedError
+
+    def _sample(self, logits: np.ndarray, seen: set, banned: set, temperature: float, top_p: float, top_k: int, rng) -> int:
+        """
+        Pick the next token; temperature 0 means deterministic greedy decoding
+        """
+        logits = logits.astype(np.float64)
+        if seen:
+            ids = np.fromiter(seen, dtype=np.int64)
+            scores = logits[ids]
+            logits[ids] = np.where(scores < 0, scores * REPETITION_PENALTY, scores / REPETITION_PENALTY)
+        if banned:
+            logits[np.fromiter(banned, dtype=np.int64)] = -np.inf
+        if temperature == 0:
+            return int(np.argmax(logits))
+
+        logits = logits / temperature
+        if 0 < top_k < logits.shape[-1]:
+            kth = np.partition(logits, -top_k)[-top_k]
+            logits[logits < kth] = -np.inf
+        probs = np.exp(logits - np.max(logits))
+        probs /= probs.sum()
+        if top_p < 1.0:
+            order = np.argsort(-probs)
+            cumulative = np.cumsum(probs[order])
+            keep = order[:int(np.searchsorted(cumulative, top_p)) + 1]  # Smallest set reaching top_p
+            mask = np.zeros_like(probs)
+            mask[keep] = probs[keep]
+            probs = mask / mask.sum()
+        return int(rng.choice(probs.shape[-1], p=probs))
+
+    def _generate_sync(
+        self,
+        input_ids: List[int],
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        top_k: int,
+        on_text: Optional[Callable[[str], None]] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> List[int]:
+        """
+        Decode loop run in the thread pool, returning the generated token ids
+        """
+        rng = np.random.default_rng()
+        started = time.perf_counter()
+        state, logits = self._prefill(input_ids)
+        prefill_end = time.perf_counter()
+
+        seen = set(input_ids)
+        # (n-1)-token prefix -> tokens that followed it, over prompt and output like transformers does
+        n = self.no_repeat_ngram_size
+        sequence = list(input_ids)
+        ngrams: Dict[Tuple[int, ...], set] = {}
+        for start in range(len(sequence) - n + 1 if n > 0 else 0):
+            ngrams.setdefault(tuple(sequence[start:start + n - 1]), set()).add(sequence[start + n - 1])
+        output_ids: List[int] = []
+        emitted = 0
+        while len(output_ids) < max_new_tokens:
+            if cancel is not None and cancel.is_cancelled:
+                break
+            banned = ngrams.get(tuple(sequence[len(sequence) - n + 1:]), set()) if n > 0 else set()
+            token_id = self._sample(logits, seen, banned, temperature, top_p, top_k, rng)
+            if token_id in self.stop_token_ids:
+                break
+            output_ids.append(token_id)
+            seen.add(token_id)
+            sequence.append(token_id)
+            if 0 < n <= len(sequence):
+                ngrams.setdefault(tuple(sequence[-n:-1]), set()).add(token_id)
+            if on_text is not None:
+                emitted = self._emit_text(output_ids, emitted, on_text)
+            if len(output_ids) < max_new_tokens:
+                state, logits = self._forward(state, token_id)
+
+        metrics.record_generation(len(input_ids), len(output_ids), prefill_end - started, time.perf_counter() - prefill_end)
+        if usage is not None:
+            usage.add(len(input_ids), len(output_ids))
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        return output_ids
+
+    def _emit_text(self, output_ids: List[int], emitted: int, on_text: Callable[[str], None]) -> int:
+        """
+        Push newly decoded text, holding back incomplete multi-byte characters
+        """
+        text = self.tokenizer.decode(output_ids, skip_special_tokens=True)
+        if text.endswith("\ufffd") or len(text) <= emitted:
+            return emitted
+        on_text(text[emitted:])
+        return len(text)
+
+    def _decode_response(self, token_ids: List[int]) -> str:
+        """
+        Decode prompt + generated tokens and strip the chat template
+        """
+        with metrics.STAGE_DURATION.labels("detokenize").time():
+            response = self.tokenizer.decode(token_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        return strip_chat_template(response)
+
+    def _prepare_inputs(self, prompt: str, max_length: int) -> List[int]:
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            return self.prompt_builder.build(prompt, min(max_length, 512), suffix="Let me help you with that.").input_ids
+
+    def warm_up(self):
+        """
+        One short generation so the first user doesn't pay for lazy initialization
+        """
+        start = time.perf_counter()
+        input_ids = self._prepare_inputs("Hi!", 16)
+        self._generate_sync(input_ids, 16, 0.7, 0.95, 50)
+        print(f"Warm-up generation ({len(input_ids)} prompt tokens) took {time.perf_counter() - start:.1f}s")
+
+    async def generate_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        input_ids = self._prepare_inputs(prompt, max_length)
+        output_ids = await self._run_in_executor(
+            self._generate_sync, input_ids, min(max_length, 512), temperature, top_p, top_k, None, cancel, usage
+        )
+        return self._decode_response(input_ids + output_ids)
+
+    async def stream_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronous generator yielding text chunks as soon as they are decoded
+        """
+        cancel = cancel or CancellationToken()  # Needed to stop generation if the consumer goes away
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        input_ids = self._prepare_inputs(prompt, max_length)
+
+        def on_text(text: str):
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        def run():
+            try:
+                return self._generate_sync(input_ids, min(max_length, 512), temperature, top_p, top_k, on_text, cancel, usage)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)  # End of stream marker
+
+        generation = self._run_in_executor(run)
+        finished = False
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    finished = True
+                    break
+                yield chunk
+        finally:
+            if not finished and not generation.done():
+                cancel.cancel("stream consumer stopped")  # Don't keep decoding for nobody
+                generation.add_done_callback(lambda future: future.cancelled() or future.exception())  # Nobody awaits it
+
+        await generation  # Re-raise generation errors, if any
+
+    async def generate_chat_turn(
+        self,
+        session,
+        store,
+        message: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        """
+        Answer a new message in a chat session; no session cache is kept, the history is prefilled every turn
+        """
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            input_ids = self.prompt_builder.build_chat(session.history, message, min(max_length, 512)).input_ids
+        output_ids = await self._run_in_executor(
+            self._generate_sync, input_ids, min(max_length, 512), temperature, top_p, top_k, None, cancel, usage
+        )
+        with metrics.STAGE_DURATION.labels("detokenize").time():
+            answer = self.tokenizer.decode(output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True).strip()
+        session.history.append((message, answer))
+        return answer
+
+    async def generate_bulk(
+        self,
+        items: List[dict],
+        batch_size: int,
+        admit: Optional[Callable] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Run many prompts, batch_size at a time spread over the generation slots, yielding (index, response, error)
+        """
+        for start in range(0, len(items), batch_size):
+            indices = range(start, min(start + batch_size, len(items)))
+            async with admit() if admit is not None else nullcontext():
+                results = await asyncio.gather(*[
+                    self.generate_response(
+                        items[index]["prompt"],
+                        items[index]["max_length"],
+                        items[index]["temperature"],
+                        items[index]["top_p"],
+                        items[index]["top_k"],
+                        cancel=cancel,
+                        usage=usage
+                    )
+                    for index in indices
+                ], return_exceptions=True)
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+            for index, result in zip(indices, results):
+                if isinstance(result, GenerationCancelled):
+                    raise result
+                if isinstance(result, Exception):
+                    print(f"Error during bulk generation: {str(result)}")
+                    yield index, None, str(result)
+                else:
+                    yield index, result, None
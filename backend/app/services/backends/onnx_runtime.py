@@ -0,0 +1,143 @@
+from typing import Callable, List, Optional, Tuple  # For type hints
+from app.core.config import settings  # ONNX model location
+from app.services.backends.base import TokenLoopBackend  # Shared decode loop
+import numpy as np  # Model inputs and outputs
+import threading  # Prefix cache lock
+import json  # Model config
+import os  # Paths
+
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+}
+
+class OnnxRuntimeBackend(TokenLoopBackend):
+    """
+    ONNX Runtime CPU backend for a decoder exported with KV-cache inputs, e.g.
+    `optimum-cli export onnx --task text-generation-with-past --model models/gemma-3-4b-it models/gemma-3-4b-it-onnx`
+
+    Inputs are input_ids, attention_mask, past_key_values.<i>.key/value and optionally position_ids,
+    cache_position or use_cache_branch; outputs are logits and present.<i>.key/value
+    """
+    name = "onnxruntime"
+
+    def __init__(
+        self,
+        on_progress: Optional[Callable[[str, float], None]] = None,
+        cpu_cores: Optional[List[int]] = None
+    ):
+        import onnxruntime as ort  # Optional dependency, only needed for this backend
+        from transformers import AutoTokenizer  # Tokenizer files are exported next to the model
+        report = on_progress or (lambda stage, progress: None)  # Load progress callback
+        self.model_path = settings.LLM_ONNX_MODEL_PATH
+
+        print(f"Loading ONNX model from {self.model_path}")
+        report("loading tokenizer", 0.05)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path, local_files_only=True)
+        stop_ids = {tokenizer.eos_token_id}
+        end_of_turn_id = tokenizer.convert_tokens_to_ids("<end_of_turn>")
+        if end_of_turn_id is not None and end_of_turn_id != tokenizer.unk_token_id:
+            stop_ids.add(end_of_turn_id)
+
+        config = self._read_config()
+        context_tokens = min(settings.LLM_CONTEXT_TOKENS, config.get("max_position_embeddings") or settings.LLM_CONTEXT_TOKENS)
+        super().__init__(tokenizer, list(stop_ids), context_tokens, cpu_cores)
+
+        # Concurrent runs share the session's intra-op pool, so it gets every slot's cores
+        report("loading model", 0.1)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.thread_layout.threads_per_slot * self.thread_layout.slots
+        options.inter_op_num_threads = self.thread_layout.interop_threads
+        if self.thread_layout.slots > 1:
+            options.add_session_config_entry("session.intra_op.allow_spinning", "0")  # Idle threads don't steal cores
+        self.session = ort.InferenceSession(
+            os.path.join(self.model_path, settings.LLM_ONNX_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        print(f"Threading layout: {self.thread_layout.describe()}")
+
+        # KV-cache inputs and the outputs feeding them back
+        inputs = {model_input.name: model_input for model_input in self.session.get_inputs()}
+        self.input_names = set(inputs)
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        self.past_names = sorted(
+            (name for name in inputs if name.startswith("past_key_values.")),
+            key=lambda name: (int(name.split(".")[1]), name)
+        )
+        if not self.past_names:
+            raise ValueError(f"{self.model_path} has no past_key_values inputs, export it with --task text-generation-with-past")
+        self.present_names = [name.replace("past_key_values", "present") for name in self.past_names]
+        past_input = inputs[self.past_names[0]]
+        self.past_dtype = ONNX_DTYPES.get(past_input.type, np.float32)
+        heads, head_dim = past_input.shape[1], past_input.shape[3]
+        if not isinstance(heads, int):
+            heads = config.get("num_key_value_heads") or config["num_attention_heads"]
+        if not isinstance(head_dim, int):
+            head_dim = config.get("head_dim") or config["hidden_size"] // config["num_attention_heads"]
+        self.empty_past_shape = (1, heads, 0, head_dim)
+
+        # KV cache of the constant system prompt prefix; arrays are never written to, so requests share them
+        self._prefix_lock = threading.Lock()
+        self._prefix: Tuple[List[int], Optional[list]] = ([], None)
+        if settings.LLM_PREFIX_CACHE_ENABLED:
+            report("caching system prompt", 0.7)
+            self._prefix_past(self.prompt_builder.prefix_ids())
+        print(f"ONNX model loaded ({len(self.past_names) // 2} layers, KV cache {self.past_dtype.__name__})")
+
+    def _read_config(self) -> dict:
+        with open(os.path.join(self.model_path, "config.json")) as f:
+            config = json.load(f)
+        return config.get("text_config", config)  # Multimodal exports nest the decoder config
+
+    def _run(self, input_ids: List[int], past: list, past_length: int) -> Tuple[list, np.ndarray]:
+        """
+        One forward pass over input_ids on top of past, returning the new past and last-position logits
+        """
+        positions = np.arange(past_length, past_length + len(input_ids), dtype=np.int64)
+        feed = {
+            "input_ids": np.array([input_ids], dtype=np.int64),
+            "attention_mask": np.ones((1, past_length + len(input_ids)), dtype=np.int64),
+        }
+        if "position_ids" in self.input_names:
+            feed["position_ids"] = positions[None, :]
+        if "cache_position" in self.input_names:
+            feed["cache_position"] = positions
+        if "use_cache_branch" in self.input_names:
+            feed["use_cache_branch"] = np.array([past_length > 0])  # Merged decoders switch on this
+        feed.update(zip(self.past_names, past))
+
+        outputs = dict(zip(self.output_names, self.session.run(None, feed)))
+        return [outputs[name] for name in self.present_names], outputs["logits"][0, -1]
+
+    def _empty_past(self) -> list:
+        return [np.zeros(self.empty_past_shape, dtype=self.past_dtype) for _ in self.past_names]
+
+    def _prefix_past(self, prefix_ids: List[int]) -> list:
+        """
+        Past of the system prefix, computed once per system prompt
+        """
+        with self._prefix_lock:
+            cached_ids, past = self._prefix
+            if cached_ids != prefix_ids or past is None:
+                past, _ = self._run(prefix_ids, self._empty_past(), 0)
+                self._prefix = (prefix_ids, past)
+                print(f"System prompt prefix cached ({len(prefix_ids)} tokens)")
+            return past
+
+    def _prefill(self, input_ids: List[int]) -> Tuple[tuple, np.ndarray]:
+        prefix_ids = self.prompt_builder.prefix_ids()
+        if settings.LLM_PREFIX_CACHE_ENABLED and len(input_ids) > len(prefix_ids) and input_ids[:len(prefix_ids)] == prefix_ids:
+            # Only the user part gets prefilled
+            past, past_length = self._prefix_past(prefix_ids), len(prefix_ids)
+        else:
+            past, past_length = self._empty_past(), 0
+        past, logits = self._run(input_ids[past_length:], past, past_length)
+        return (past, len(input_ids)), logits
+
+    def _forward(self, state: tuple, token_id: int) -> Tuple[tuple, np.ndarray]:
+        past, past_length = state
+        past, logits = self._run([token_id], past, past_length)
+        return (past, past_length + 1), logits
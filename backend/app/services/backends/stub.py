@@ -0,0 +1,50 @@
+from typing import List, Optional, Tuple  # For type hints
+from app.core.config import settings  # Stub latency
+from app.services.backends.base import TokenLoopBackend  # Shared decode loop
+import numpy as np  # Logits
+import hashlib  # Deterministic answers
+import time  # Simulated step latency
+
+class ByteTokenizer:
+    """
+    UTF-8 byte tokenizer (ids 0-255) with BOS and EOS, enough for the prompt builder and decoding
+    """
+    bos_token_id = 256
+    eos_token_id = 257
+    vocab_size = 258
+
+    def __call__(self, text: str, add_special_tokens: bool = True) -> dict:
+        ids = list(text.encode("utf-8"))
+        return {"input_ids": [self.bos_token_id] + ids if add_special_tokens else ids}
+
+    def decode(self, token_ids: List[int], skip_special_tokens: bool = True, **kwargs) -> str:
+        return bytes(token_id for token_id in token_ids if token_id < 256).decode("utf-8", errors="replace")
+
+class StubBackend(TokenLoopBackend):
+    """
+    Model-free backend for tests and load tests: the answer depends only on the prompt tokens
+    """
+    name = "stub"
+    no_repeat_ngram_size = 0  # Scripted answer, banning its tokens would leave nothing to pick
+
+    def __init__(self, on_progress=None, cpu_cores: Optional[List[int]] = None):
+        tokenizer = ByteTokenizer()
+        super().__init__(tokenizer, [tokenizer.eos_token_id], settings.LLM_CONTEXT_TOKENS, cpu_cores)
+        self.step_delay = settings.LLM_STUB_TOKEN_DELAY_MS / 1000
+        print(f"Stub inference backend ready ({settings.LLM_STUB_TOKEN_DELAY_MS}ms per token)")
+
+    def _logits(self, answer: List[int], position: int) -> np.ndarray:
+        logits = np.full(self.tokenizer.vocab_size, -np.inf)
+        logits[answer[position] if position < len(answer) else self.tokenizer.eos_token_id] = 0.0
+        return logits
+
+    def _prefill(self, input_ids: List[int]) -> Tuple[tuple, np.ndarray]:
+        digest = hashlib.sha1(bytes(str(input_ids), "ascii")).hexdigest()[:12]
+        answer = self.tokenizer(f"Stub answer {digest}.", add_special_tokens=False)["input_ids"]
+        return (answer, 0), self._logits(answer, 0)
+
+    def _forward(self, state: tuple, token_id: int) -> Tuple[tuple, np.ndarray]:
+        if self.step_delay:
+            time.sleep(self.step_delay)  # Stands in for a decode step, releases the GIL like a real one
+        answer, position = state
+        return (answer, position + 1), self._logits(answer, position + 1)
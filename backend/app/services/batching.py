@@ -0,0 +1,233 @@
+from dataclasses import dataclass, field  # Request containers
+from typing import List, Optional  # For type hints
+from transformers import NoRepeatNGramLogitsProcessor, RepetitionPenaltyLogitsProcessor  # Shared logits processors
+from app.core import metrics  # Stage latency and token metrics
+import torch  # PyTorch ML framework
+import asyncio  # For async operations
+import time  # Batch window timing
+import copy  # Per-batch copies of the prefix cache
+
+@dataclass
+class BatchRequest:
+    """
+    Single generation request waiting to be scheduled into a batch
+    """
+    input_ids: List[int]  # Prompt token ids (without padding)
+    max_new_tokens: int
+    temperature: float  # 0 means greedy decoding
+    top_p: float
+    top_k: int  # 0 disables top-k filtering
+    future: Optional[asyncio.Future] = None  # Set when queued through submit(), unused by run_batch()
+    prefix_cache: Optional[object] = None  # Shared KV cache covering the start of input_ids
+    streamer: Optional[object] = None  # Optional TextStreamer fed with generated tokens
+    cancel: Optional[object] = None  # Optional CancellationToken checked after every step
+    output_ids: List[int] = field(default_factory=list)  # Generated token ids
+    submitted_at: float = field(default_factory=time.perf_counter)
+    finished: bool = False
+
+def sample_next_tokens(
+    scores: torch.Tensor,
+    temperatures: torch.Tensor,
+    top_ks: torch.Tensor,
+    top_ps: torch.Tensor
+) -> torch.Tensor:
+    """
+    Pick next token for each row using its own temperature, top-k and top-p
+    """
+    greedy = temperatures <= 0
+    scores = scores / temperatures.clamp(min=1e-5).unsqueeze(-1)
+
+    # Work in sorted space so top-k and top-p are simple per-row masks
+    sorted_scores, sorted_indices = torch.sort(scores, descending=True, dim=-1)
+    ranks = torch.arange(scores.shape[-1], device=scores.device).unsqueeze(0)
+    top_k_mask = (top_ks.unsqueeze(-1) > 0) & (ranks >= top_ks.unsqueeze(-1))
+    sorted_scores = sorted_scores.masked_fill(top_k_mask, float("-inf"))
+
+    probs = torch.softmax(sorted_scores, dim=-1)
+    top_p_mask = (probs.cumsum(dim=-1) - probs) > top_ps.unsqueeze(-1)  # Always keeps the best token
+    sorted_scores = sorted_scores.masked_fill(top_p_mask, float("-inf"))
+
+    choice = torch.multinomial(torch.softmax(sorted_scores, dim=-1), num_samples=1)
+    sampled = sorted_indices.gather(-1, choice).squeeze(-1)
+    return torch.where(greedy, sorted_indices[:, 0], sampled)
+
+class BatchScheduler:
+    """
+    Collects concurrent requests for a short window and decodes them as one left-padded batch
+    """
+    def __init__(self, service, max_batch_size: int, window_ms: float):
+        self.service = service  # LLMService owning model, tokenizer and executor
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+        # Same penalties as the single-request generate() path
+        self.logits_processors = [
+            RepetitionPenaltyLogitsProcessor(penalty=1.2),
+            NoRepeatNGramLogitsProcessor(3)
+        ]
+        self.stop_token_ids = service.stop_token_ids
+
+    async def submit(self, request: BatchRequest) -> List[int]:
+        """
+        Queue request and wait for its generated token ids
+        """
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._collect_batches())
+
+        await self.queue.put(request)
+        return await request.future
+
+    async def _collect_batches(self):
+        """
+        Background loop: gather a batch, run it in the executor, resolve futures
+        """
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.window
+
+            # Wait for more requests until the window closes or the batch is full
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Skip abandoned requests, cancelled ones resolve right away with no output
+            for request in batch:
+                if not request.future.done() and request.cancel is not None and request.cancel.is_cancelled:
+                    if request.streamer is not None:
+                        request.streamer.end()
+                    request.future.set_result([])
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+
+            for request in batch:
+                metrics.QUEUE_WAIT.labels("batch").observe(time.perf_counter() - request.submitted_at)
+
+            try:
+                await self.service._run_in_executor(self.run_batch, batch)
+            except Exception as e:
+                print(f"Error during batched generation: {str(e)}")
+                for request in batch:
+                    if request.streamer is not None:
+                        request.streamer.end()
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(request.output_ids)
+
+    def run_batch(self, batch: List[BatchRequest]):
+        """
+        Synchronous batched decode loop to run in thread pool; fills each request's output_ids
+
+        Used by the scheduler queue and directly by bulk runs and benchmarks, which build
+        requests without a future
+        """
+        model = self.service.model
+        device = self.service.device
+        pad_token_id = self.service.tokenizer.pad_token_id
+
+        # Reuse the system prompt cache only if every request in the batch was built on the same one
+        prefix_cache = batch[0].prefix_cache
+        if prefix_cache is not None and any(r.prefix_cache is not prefix_cache for r in batch):
+            prefix_cache = None
+        prefix_length = prefix_cache.get_seq_length() if prefix_cache is not None else 0
+
+        # Layout per row: [shared prefix][left padding][request tokens]
+        suffixes = [r.input_ids[prefix_length:] for r in batch]
+        max_suffix = max(len(suffix) for suffix in suffixes)
+        input_ids = torch.tensor(
+            [r.input_ids[:prefix_length] + [pad_token_id] * (max_suffix - len(s)) + s for r, s in zip(batch, suffixes)],
+            device=device
+        )
+        attention_mask = torch.tensor(
+            [[1] * prefix_length + [0] * (max_suffix - len(s)) + [1] * len(s) for s in suffixes],
+            device=device
+        )
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        past_key_values = None
+        if prefix_cache is not None:
+            past_key_values = copy.deepcopy(prefix_cache)
+            past_key_values.batch_repeat_interleave(len(batch))  # One copy of the prefix per row
+
+        # Per-request sampling parameters
+        temperatures = torch.tensor([r.temperature for r in batch], dtype=torch.float32, device=device)
+        top_ks = torch.tensor([r.top_k for r in batch], device=device)
+        top_ps = torch.tensor([r.top_p for r in batch], dtype=torch.float32, device=device)
+
+        for request in batch:
+            if request.streamer is not None:
+                request.streamer.put(torch.tensor(request.input_ids))  # Prompt is skipped by the streamer
+
+        sequences = input_ids
+        max_steps = max(request.max_new_tokens for request in batch)
+        started = time.perf_counter()
+        with torch.no_grad():
+            # Prefill everything not covered by the prefix cache
+            outputs = model(
+                input_ids=input_ids[:, prefix_length:],
+                attention_mask=attention_mask,
+                position_ids=position_ids[:, prefix_length:],
+                past_key_values=past_key_values,
+                use_cache=True
+            )
+            prefill_end = time.perf_counter()
+            for _ in range(max_steps):
+                scores = outputs.logits[:, -1, :].float()
+                for processor in self.logits_processors:
+                    scores = processor(sequences, scores)
+                next_tokens = sample_next_tokens(scores, temperatures, top_ks, top_ps)
+
+                for i, request in enumerate(batch):
+                    if not request.finished and request.cancel is not None and request.cancel.is_cancelled:
+                        request.finished = True  # Row stops, the rest of the batch keeps going
+                        if request.streamer is not None:
+                            request.streamer.end()
+                    if request.finished:
+                        next_tokens[i] = pad_token_id  # Finished rows just carry padding
+                        continue
+                    token = int(next_tokens[i])
+                    if token in self.stop_token_ids:
+                        request.finished = True
+                    else:
+                        request.output_ids.append(token)
+                        if request.streamer is not None:
+                            request.streamer.put(torch.tensor([token]))
+                        if len(request.output_ids) >= request.max_new_tokens:
+                            request.finished = True
+                    if request.finished and request.streamer is not None:
+                        request.streamer.end()
+
+                if all(request.finished for request in batch):
+                    break
+
+                # Feed only the new tokens, the rest comes from the KV cache
+                sequences = torch.cat([sequences, next_tokens.unsqueeze(-1)], dim=-1)
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones((len(batch), 1))], dim=-1)
+                position_ids = position_ids[:, -1:] + 1
+                outputs = model(
+                    input_ids=next_tokens.unsqueeze(-1),
+                    attention_mask=attention_mask,
+                    position_ids=position_ids,
+                    past_key_values=outputs.past_key_values,
+                    use_cache=True
+                )
+
+        finished = time.perf_counter()
+        for request in batch:
+            if not request.finished and request.streamer is not None:
+                request.streamer.end()
+            request.finished = True
+            metrics.record_generation(len(request.input_ids), len(request.output_ids), prefill_end - started, finished - prefill_end)
\ No newline at end of file
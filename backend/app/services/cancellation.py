@@ -0,0 +1,41 @@
+from typing import Optional  # For type hints
+import threading  # Cross-thread cancellation flag
+import time  # Deadlines
+
+class GenerationCancelled(Exception):
+    """
+    Generation stopped early because the client went away or the deadline passed
+    """
+    def __init__(self, reason: str):
+        super().__init__(f"Generation cancelled: {reason}")
+        self.reason = reason
+
+class CancellationToken:
+    """
+    Cancellation flag plus wall-clock deadline shared between the API and a generation thread
+    """
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.event = threading.Event()
+        self.deadline = time.monotonic() + timeout_seconds if timeout_seconds is not None else None  # 0 is already due
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        if not self.event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+        return self.event.is_set()
+
+    @property
+    def remaining_seconds(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def raise_if_cancelled(self):
+        if self.is_cancelled:
+            raise GenerationCancelled(self.reason)
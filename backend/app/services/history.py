@@ -0,0 +1,174 @@
+from datetime import datetime, timezone  # Timestamps
+from typing import Dict, List, Optional  # For type hints
+from sqlalchemy import insert, select, update  # Bulk statements
+from app.core.config import settings  # History settings
+from app.db.session import AsyncSessionLocal  # Async database sessions
+from app.models.conversation import Conversation, Message  # History tables
+import asyncio  # Background writer
+import time  # Batch window timing
+import uuid  # Conversation ids
+
+class HistoryWriter:
+    """
+    Conversation history recorder: requests enqueue records, a background task writes them in batches
+    """
+    def __init__(self, batch_size: int, flush_interval_ms: float, max_queue: int):
+        self.batch_size = batch_size
+        self.window = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.pending_owners: Dict[str, int] = {}  # Conversations queued but not written yet -> user id
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._write_batches())
+
+    async def stop(self):
+        """
+        Stop the writer and write what is still queued
+        """
+        if self.worker is not None and not self.worker.done():
+            # Not cancelled, a write interrupted halfway would drop its batch and leave its connection open
+            await self.queue.put(None)
+            await self.worker
+        self.worker = None
+        while self.queue is not None and not self.queue.empty():
+            batch = [self.queue.get_nowait() for _ in range(min(self.batch_size, self.queue.qsize()))]
+            await self._write(batch)
+
+    def _enqueue(self, kind: str, record: dict):
+        self.start()
+        try:
+            self.queue.put_nowait((kind, record))
+        except asyncio.QueueFull:
+            self.dropped += 1  # Never block a request on history
+            print(f"History queue full, dropped {kind} record")
+
+    def start_conversation(self, user_id: int, title: str, conversation_id: Optional[str] = None) -> str:
+        """
+        Queue a new conversation and return its id right away
+        """
+        conversation_id = conversation_id or uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        self.pending_owners[conversation_id] = user_id
+        self._enqueue("conversation", {
+            "id": conversation_id,
+            "user_id": user_id,
+            "title": title.strip()[:200],
+            "created_at": now,
+            "updated_at": now,
+        })
+        return conversation_id
+
+    def add_message(self, conversation_id: str, role: str, content: str):
+        self._enqueue("message", {
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    def record_exchange(self, user_id: int, conversation_id: Optional[str], prompt: str, answer: str) -> str:
+        """
+        Queue a prompt/answer pair, starting a conversation if none is given
+        """
+        if conversation_id is None:
+            conversation_id = self.start_conversation(user_id, prompt)
+        self.add_message(conversation_id, "user", prompt)
+        self.add_message(conversation_id, "model", answer)
+        return conversation_id
+
+    async def owner_of(self, conversation_id: str) -> Optional[int]:
+        """
+        User owning the conversation (including ones not written yet), None if it doesn't exist
+        """
+        if conversation_id in self.pending_owners:
+            return self.pending_owners[conversation_id]
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Conversation.user_id).where(Conversation.id == conversation_id))
+            return result.scalar()
+
+    async def _write_batches(self):
+        """
+        Background loop: gather records until the batch is full or the window closes, then write them
+        """
+        stopping = False
+        while not stopping:
+            record = await self.queue.get()
+            if record is None:
+                return  # Stop marker from stop()
+            batch = [record]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._write(batch)
+
+    async def _write(self, batch: List[tuple]):
+        """
+        Write one batch in a single transaction with multi-row inserts
+        """
+        conversations = [record for kind, record in batch if kind == "conversation"]
+        messages = [record for kind, record in batch if kind == "message"]
+        last_message_at: Dict[str, datetime] = {}
+        for message in messages:
+            last_message_at[message["conversation_id"]] = message["created_at"]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                if conversations:
+                    await db.execute(insert(Conversation), conversations)
+                if messages:
+                    await db.execute(insert(Message), messages)
+                for conversation_id, updated_at in last_message_at.items():
+                    await db.execute(
+                        update(Conversation).where(Conversation.id == conversation_id).values(updated_at=updated_at)
+                    )
+                await db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            self.errors += 1
+            print(f"History write failed, dropped {len(batch)} records: {str(e)}")
+        finally:
+            for conversation in conversations:
+                self.pending_owners.pop(conversation["id"], None)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.HISTORY_ENABLED,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+# Global history writer
+history_writer: Optional[HistoryWriter] = None
+
+def get_history_writer() -> HistoryWriter:
+    """
+    Get or create history writer instance (singleton pattern)
+    """
+    global history_writer
+    if history_writer is None:
+        history_writer = HistoryWriter(
+            batch_size=settings.HISTORY_BATCH_SIZE,
+            flush_interval_ms=settings.HISTORY_FLUSH_INTERVAL_MS,
+            max_queue=settings.HISTORY_MAX_QUEUE
+        )
+    return history_writer
@@ -1,106 +1,753 @@
-from typing import Optional  # For type hints
-from transformers import AutoTokenizer, AutoModelForCausalLM  # Core LLM components
+from typing import AsyncIterator, Callable, List, Optional, Tuple  # For type hints
+from contextlib import nullcontext  # No-op admission for bulk runs
+from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM, DynamicCache, StoppingCriteria, StoppingCriteriaList, TextStreamer  # Core LLM components
 import torch  # PyTorch ML framework
 from pathlib import Path  # Path manipulation
 import os  # OS utilities
 from app.core.config import settings  # Import settings for system prompt
+from app.core import metrics  # Stage latency and token metrics
+from app.services.backends.base import InferenceBackend, strip_chat_template  # Backend interface
+from app.services.batching import BatchRequest, BatchScheduler  # Dynamic request batching
+from app.services.cancellation import CancellationToken, GenerationCancelled  # Early stop
+from app.services.speculative import SpeculationTracker  # Draft acceptance statistics
+from app.services.usage import TokenUsage  # Per-request token accounting
+from app.services.prompt_builder import PromptBuilder  # Token-budgeted chat template
+from app.services.threading_policy import SlotInitializer, configure_process, generation_slots, plan_layout  # CPU split between generations
 from concurrent.futures import ThreadPoolExecutor  # For parallel processing
 import asyncio  # For async operations
+import threading  # Prefix cache rebuild lock
+import copy  # Per-request copies of the prefix cache
+import time  # Self-check timing
+import json  # Safetensors header parsing
+import mmap  # Memory-mapped weights
+import struct  # Safetensors header parsing
 
-class LLMService:
+# Supported CPU precision modes and the dtype weights are loaded in
+PRECISION_DTYPES = {
+    "float32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "int8": torch.float32,  # Loaded in float32, then Linear layers are quantized
+}
+
+def process_memory_mb() -> float:
+    """
+    Resident memory of the current process in MB
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource  # Fallback for systems without procfs (peak value)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Accelerated decoding variants
+SPECULATIVE_MODES = ("off", "draft", "prompt_lookup")
+
+# Safetensors dtype codes understood by the mmap loader
+SAFETENSORS_DTYPES = {
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+def export_mmap_weights(model_path: str, precision: str) -> str:
+    """
+    Write a single safetensors file in the load dtype, so workers can map it without conversion
+    """
+    weights_path = Path(model_path) / f"mmap-{precision}.safetensors"
+    if weights_path.exists():
+        return str(weights_path)
+
+    from safetensors.torch import save_model  # Handles tied weights
+
+    print(f"Exporting {precision} weights to {weights_path}...")
+    model = AutoModelForCausalLM.from_pretrained(
+        model_path,
+        torch_dtype=PRECISION_DTYPES[precision],
+        local_files_only=True,
+        low_cpu_mem_usage=True
+    )
+    tmp_path = weights_path.with_suffix(".tmp")
+    save_model(model, str(tmp_path))
+    tmp_path.rename(weights_path)  # Never leave a half-written file behind
+    return str(weights_path)
+
+def load_mmap_state_dict(weights_path: str) -> dict:
+    """
+    Map a safetensors file into memory and build tensors directly on top of the mapping
+    """
+    with open(weights_path, "rb") as weights_file:
+        header_size = struct.unpack("<Q", weights_file.read(8))[0]
+        header = json.loads(weights_file.read(header_size))
+        # Private copy-on-write mapping: read-only pages stay shared through the page cache
+        buffer = mmap.mmap(weights_file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    state_dict = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        if end == start:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        count = (end - start) // torch.tensor([], dtype=dtype).element_size()
+        state_dict[name] = torch.frombuffer(
+            buffer,
+            dtype=dtype,
+            count=count,
+            offset=data_start + start
+        ).view(info["shape"])
+    return state_dict
+
+def tied_weight_names(model) -> dict:
+    """
+    Tied parameter name -> name of the parameter it shares storage with
+    """
+    if hasattr(model, "get_expanded_tied_weights_keys"):
+        return model.get_expanded_tied_weights_keys(all_submodels=True)
+    # Older transformers only tie the output embeddings to the input embeddings
+    if not getattr(model.config.get_text_config(), "tie_word_embeddings", False) or model.get_output_embeddings() is None:
+        return {}
+    module_names = {module: name for name, module in model.named_modules()}
+    return {
+        f"{module_names[model.get_output_embeddings()]}.weight": f"{module_names[model.get_input_embeddings()]}.weight"
+    }
+
+def load_mmap_model(model_path: str, weights_path: str, dtype: torch.dtype):
+    """
+    Build model skeleton without allocating weights and attach memory-mapped tensors
+    """
+    from accelerate import init_empty_weights  # Parameters on meta device, buffers on CPU
+
+    config = AutoConfig.from_pretrained(model_path, local_files_only=True)
+    with init_empty_weights():
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=dtype)
+
+    # Tied weights are stored only once in the file (under either name), give every name of a tie the tensor
+    state_dict = load_mmap_state_dict(weights_path)
+    for tied_name, source_name in tied_weight_names(model).items():
+        if tied_name in state_dict and source_name not in state_dict:
+            state_dict[source_name] = state_dict[tied_name]
+        elif source_name in state_dict and tied_name not in state_dict:
+            state_dict[tied_name] = state_dict[source_name]
+
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()  # Share one parameter again
+
+    missing = [name for name, param in model.named_parameters() if param.device.type == "meta"]
+    if missing:
+        raise RuntimeError(f"Weights missing from {weights_path}: {missing[:5]}")
+    return model
+
+class AsyncTextStreamer(TextStreamer):
+    """
+    Streamer that hands decoded text chunks from the generation thread to an asyncio queue
+    """
+    def __init__(self, tokenizer, loop: asyncio.AbstractEventLoop, **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        """
+        Called from the generation thread whenever a chunk of text is ready
+        """
+        if text:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, text)
+        if stream_end:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)  # End of stream marker
+
+class CancellationCriteria(StoppingCriteria):
+    """
+    Stops model.generate() as soon as the token is cancelled
+    """
+    def __init__(self, token: CancellationToken):
+        self.token = token
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.token.is_cancelled, dtype=torch.bool, device=input_ids.device)
+
+class GenerationTimer(StoppingCriteria):
+    """
+    Splits generate() time into prefill and decode: criteria are first checked right after the prefill token
+    """
     def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+    def record(self, prompt_tokens: int, generated_tokens: int):
+        finished = time.perf_counter()
+        prefill_end = self.first_token_at or finished
+        metrics.record_generation(prompt_tokens, generated_tokens, prefill_end - self.started, finished - prefill_end)
+
+class LLMService(InferenceBackend):
+    """
+    Transformers (eager PyTorch) backend
+    """
+    name = "transformers"
+
+    def __init__(
+        self,
+        mmap_weights_path: Optional[str] = None,
+        on_progress: Optional[Callable[[str, float], None]] = None,
+        cpu_cores: Optional[List[int]] = None
+    ):
+        report = on_progress or (lambda stage, progress: None)  # Load progress callback
         self.device = "cpu"  # Force CPU usage cuz we got no server with GPU
+
+        # Split the cores between generation slots before torch starts its thread pools
+        self.thread_layout = plan_layout(generation_slots(), cpu_cores)
+        configure_process(self.thread_layout)
+        print(f"Threading layout: {self.thread_layout.describe()}")
         # Get absolute path to the model
-        current_dir = Path(os.getcwd())
-        self.model_path = str(current_dir / "models" / "gemma-3-4b-it")
+        self.model_path = settings.LLM_MODEL_PATH
         
         # Initialize tokenizer and model
         print(f"Loading model from {self.model_path}")
+        report("loading tokenizer", 0.05)
         self.tokenizer = AutoTokenizer.from_pretrained(
             self.model_path,
             local_files_only=True,  # Skip online model fetching
             padding_side="left"  # Left padding for better generation
         )
         
-        print("Loading model in float32 mode on CPU...")
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_path,
-            device_map=None,  # Disable device mapping
-            torch_dtype=torch.float32,  # Use float32 for CPU compatibility
-            local_files_only=True,  # Skip online model fetching
-            low_cpu_mem_usage=True  # Optimize memory usage
-        ).to(self.device)
+        self.precision = settings.LLM_PRECISION.lower()
+        if self.precision not in PRECISION_DTYPES:
+            raise ValueError(f"Unsupported LLM_PRECISION '{settings.LLM_PRECISION}', expected one of {list(PRECISION_DTYPES)}")
+
+        memory_before = process_memory_mb()
+        print(f"Loading model in {self.precision} mode on CPU...")
+        report("loading weights", 0.1)
+        if mmap_weights_path is not None:
+            # Weights stay in the page cache and are shared between worker processes
+            self.model = load_mmap_model(self.model_path, mmap_weights_path, PRECISION_DTYPES[self.precision])
+        else:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                self.model_path,
+                device_map=None,  # Disable device mapping
+                torch_dtype=PRECISION_DTYPES[self.precision],
+                local_files_only=True,  # Skip online model fetching
+                low_cpu_mem_usage=True  # Optimize memory usage
+            ).to(self.device)
+
+        if self.precision == "int8":
+            report("quantizing", 0.6)
+            # Dynamic quantization: int8 weights, activations quantized on the fly
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+        self.model.eval()
+        self.memory_footprint_mb = process_memory_mb() - memory_before
+
+        # Optional speculative decoding: small draft model or draft-free prompt lookup
+        self.speculative_mode = settings.LLM_SPECULATIVE_MODE.lower()
+        if self.speculative_mode not in SPECULATIVE_MODES:
+            raise ValueError(f"Unsupported LLM_SPECULATIVE_MODE '{settings.LLM_SPECULATIVE_MODE}', expected one of {list(SPECULATIVE_MODES)}")
+        self.draft_model = None
+        if self.speculative_mode == "draft":
+            report("loading draft model", 0.65)
+            print(f"Loading draft model from {settings.LLM_DRAFT_MODEL_PATH}")
+            self.draft_model = AutoModelForCausalLM.from_pretrained(
+                settings.LLM_DRAFT_MODEL_PATH,
+                torch_dtype=PRECISION_DTYPES[self.precision],
+                local_files_only=True,
+                low_cpu_mem_usage=True
+            ).to(self.device)
+            if self.precision == "int8":
+                self.draft_model = torch.ao.quantization.quantize_dynamic(self.draft_model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.draft_model.eval()
+        self.speculation: Optional[SpeculationTracker] = None
+        if self.speculative_mode != "off":
+            self.speculation = SpeculationTracker(self.model)
+            print(f"Speculative decoding enabled ({self.speculative_mode})")
 
         # Set padding token to eos token if not set
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
             self.model.config.pad_token_id = self.model.config.eos_token_id
 
-        # Initialize thread pool for parallel processing
-        self.executor = ThreadPoolExecutor(max_workers=2)  # Adjust based on CPU cores
+        # Stop on tokenizer eos, generation config eos ids and the end of a chat turn
+        stop_ids = getattr(self.model.generation_config, "eos_token_id", None) or []
+        if isinstance(stop_ids, int):
+            stop_ids = [stop_ids]
+        self.stop_token_ids = set(stop_ids) | {self.tokenizer.eos_token_id}
+        end_of_turn_id = self.tokenizer.convert_tokens_to_ids("<end_of_turn>")
+        if end_of_turn_id is not None and end_of_turn_id != self.tokenizer.unk_token_id:
+            self.stop_token_ids.add(end_of_turn_id)
+
+        # Prompt token ids within the context budget (prompt + generated tokens)
+        context_tokens = settings.LLM_CONTEXT_TOKENS
+        max_positions = getattr(self.model.config, "max_position_embeddings", None)
+        if max_positions:
+            context_tokens = min(context_tokens, max_positions)
+        self.prompt_builder = PromptBuilder(self.tokenizer, lambda: settings.SYSTEM_PROMPT, context_tokens)
+
+        # KV cache of the constant system prompt prefix, shared by all requests
+        self._prefix_lock = threading.Lock()
+        self._prefix_system_prompt: Optional[str] = None  # System prompt the cache was built for
+        self._prefix_ids: List[int] = []
+        self._prefix_cache: Optional[DynamicCache] = None
+        # Assisted generation re-feeds the whole prompt on its first forward, so it can't start from a cache
+        self.prefix_cache_enabled = settings.LLM_PREFIX_CACHE_ENABLED and self.speculative_mode == "off"
+        if self.prefix_cache_enabled:
+            report("caching system prompt", 0.7)
+            self._refresh_prefix_cache()
+
+        # One executor thread per generation slot, each with its own torch thread count (and cores if pinned)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.thread_layout.slots,
+            thread_name_prefix="llm-slot",
+            initializer=SlotInitializer(self.thread_layout)
+        )
+        metrics.EXECUTOR_THREADS.set(self.executor._max_workers)
+
+        # Optional scheduler that merges concurrent requests into one batch
+        self.batch_scheduler: Optional[BatchScheduler] = None
+        if settings.LLM_BATCHING_ENABLED:
+            self.batch_scheduler = BatchScheduler(
+                self,
+                max_batch_size=settings.LLM_MAX_BATCH_SIZE,
+                window_ms=settings.LLM_BATCH_WINDOW_MS
+            )
+            print(f"Request batching enabled (max batch {settings.LLM_MAX_BATCH_SIZE}, window {settings.LLM_BATCH_WINDOW_MS}ms)")
 
         print(f"Model loaded successfully on {self.device}")
         print(f"Model dtype: {self.model.dtype}")
 
+        if settings.LLM_SELF_CHECK:
+            report("self-check", 0.75)
+            self.self_check()
+
+    def warm_up(self):
+        """
+        Run a few dummy generations of representative lengths so the first user doesn't pay for it
+        """
+        prompts = [
+            ("Hi!", 16),  # Short chat message
+            ("I want to learn programming but I keep procrastinating. " * 20, 64),  # Long question
+        ]
+        for prompt, new_tokens in prompts:
+            start = time.perf_counter()
+            input_ids, prefix_cache = self._prepare_inputs(prompt, max_length=new_tokens)
+            self._generate_response_sync(input_ids, prefix_cache, new_tokens, 0.7, 0.95, 50)
+            print(f"Warm-up generation ({len(input_ids)} prompt tokens) took {time.perf_counter() - start:.1f}s")
+
+    def self_check(self, new_tokens: int = 16) -> dict:
+        """
+        Report memory footprint and a quick decode speed figure for the loaded precision mode
+        """
+        inputs = self.tokenizer("Hello, how are you?", return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            start = time.perf_counter()
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens,  # Fixed amount of work regardless of content
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+            elapsed = time.perf_counter() - start
+
+        generated = outputs.shape[-1] - inputs["input_ids"].shape[-1]
+        report = {
+            "precision": self.precision,
+            "model_memory_mb": round(self.memory_footprint_mb, 1),
+            "process_memory_mb": round(process_memory_mb(), 1),
+            "tokens_per_second": round(generated / elapsed, 2) if elapsed > 0 else None,
+        }
+        print(
+            f"Self-check ({report['precision']}): model ~{report['model_memory_mb']} MB, "
+            f"process {report['process_memory_mb']} MB, {report['tokens_per_second']} tokens/sec"
+        )
+        return report
+
+    def _prefix_cache_is_stale(self) -> bool:
+        """
+        Check whether the prefix cache has to be (re)built for the current system prompt
+        """
+        return self.prefix_cache_enabled and self._prefix_system_prompt != settings.SYSTEM_PROMPT
+
+    def _refresh_prefix_cache(self):
+        """
+        Prefill the system prompt prefix once and keep its past_key_values
+        """
+        with self._prefix_lock:
+            system_prompt = settings.SYSTEM_PROMPT
+            if self._prefix_system_prompt == system_prompt:
+                return  # Another thread already rebuilt it
+
+            prefix_ids = self.prompt_builder.prefix_ids()
+            with torch.no_grad():
+                outputs = self.model(
+                    input_ids=torch.tensor([prefix_ids], device=self.device),
+                    past_key_values=DynamicCache(),
+                    use_cache=True
+                )
+
+            self._prefix_ids = prefix_ids
+            self._prefix_cache = outputs.past_key_values
+            self._prefix_system_prompt = system_prompt
+            print(f"System prompt prefix cached ({len(prefix_ids)} tokens)")
+
+    def _prefix_snapshot(self) -> Tuple[Optional[List[int]], Optional[DynamicCache]]:
+        """
+        Prefix ids and their cache, read together (a concurrent rebuild swaps both under the lock)
+        """
+        if not self.prefix_cache_enabled:
+            return None, None
+        with self._prefix_lock:
+            return self._prefix_ids, self._prefix_cache
+
+    def _prepare_inputs(self, prompt: str, max_length: int) -> Tuple[List[int], Optional[DynamicCache]]:
+        """
+        Tokenize prompt within the context budget, returning input ids and the prefix cache covering their start (if usable)
+        """
+        prefix_ids, prefix_cache = self._prefix_snapshot()
+        built = self.prompt_builder.build(prompt, min(max_length, 512), prefix_ids, suffix="Let me help you with that.")
+        return built.input_ids, prefix_cache
+
+    def _prepare_chat_inputs(self, history: List[Tuple[str, str]], message: str, max_length: int) -> Tuple[List[int], Optional[DynamicCache]]:
+        """
+        Tokenize a conversation within the context budget, dropping the oldest exchanges first
+        """
+        prefix_ids, prefix_cache = self._prefix_snapshot()
+        built = self.prompt_builder.build_chat(history, message, min(max_length, 512), prefix_ids)
+        return built.input_ids, prefix_cache
+
+    def _generate_chat_sync(
+        self,
+        input_ids: List[int],
+        cache,
+        copy_cache: bool,
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        top_k: int,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> Tuple[str, List[int], DynamicCache]:
+        """
+        Generate one chat turn on top of a session cache, returning answer, covered tokens and the cache
+        """
+        if cache is None:
+            cache = DynamicCache()
+        elif copy_cache:
+            cache = copy.deepcopy(cache)  # Shared prefix cache must stay untouched
+
+        inputs = torch.tensor([input_ids], device=self.device)
+        timer = GenerationTimer()
+        if self.speculation is not None:
+            self.speculation.start()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                input_ids=inputs,
+                attention_mask=torch.ones_like(inputs),
+                past_key_values=cache,  # Only tokens past the cached ones get prefilled
+                max_new_tokens=min(max_length, 512),
+                **self._sampling_kwargs(temperature, top_p, top_k),
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=list(self.stop_token_ids),
+                repetition_penalty=1.2,
+                no_repeat_ngram_size=3,
+                stopping_criteria=self._stopping_criteria(cancel, timer),
+                return_dict_in_generate=True,
+                **self._speculative_kwargs()
+            )
+        timer.record(len(input_ids), outputs.sequences.shape[-1] - len(input_ids))
+        if usage is not None:
+            usage.add(len(input_ids), outputs.sequences.shape[-1] - len(input_ids))
+        if self.speculation is not None:
+            self.speculation.finish(outputs.sequences.shape[-1] - len(input_ids))
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+
+        sequence = outputs.sequences[0].tolist()
+        new_tokens = sequence[len(input_ids):]
+        if new_tokens and new_tokens[-1] in self.stop_token_ids:
+            # The stop token was never fed back, so the cache ends right before it
+            sequence, new_tokens = sequence[:-1], new_tokens[:-1]
+
+        with metrics.STAGE_DURATION.labels("detokenize").time():
+            answer = self.tokenizer.decode(new_tokens, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        return answer.strip(), sequence, outputs.past_key_values
+
+    async def generate_chat_turn(
+        self,
+        session,
+        store,
+        message: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        """
+        Answer a new message in a chat session, prefilling only what the session cache doesn't cover
+        """
+        if self._prefix_cache_is_stale():
+            await self._run_in_executor(self._refresh_prefix_cache)
+
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            input_ids = None
+            if session.token_ids:
+                # Close the previous model turn and open a new one on top of the retained cache
+                turn_ids = self.tokenizer(
+                    f"<end_of_turn>\n<start_of_turn>user\n{message}<end_of_turn>\n<start_of_turn>model\n",
+                    add_special_tokens=False
+                )["input_ids"]
+                if len(session.token_ids) + len(turn_ids) <= self.prompt_builder.input_budget(min(max_length, 512)):
+                    input_ids, cache, copy_cache = session.token_ids + turn_ids, session.cache, False
+                else:
+                    store.drop_cache(session)  # Conversation outgrew the context, rebuild it trimmed
+            if input_ids is None:
+                # New session, evicted or outgrown cache: re-prefill the history on top of the system prompt cache
+                input_ids, cache = self._prepare_chat_inputs(session.history, message, max_length)
+                copy_cache = True
+
+        try:
+            answer, token_ids, cache = await self._run_in_executor(
+                self._generate_chat_sync,
+                input_ids,
+                cache,
+                copy_cache,
+                max_length,
+                temperature,
+                top_p,
+                top_k,
+                cancel,
+                usage
+            )
+        except Exception:
+            store.drop_cache(session)  # Cache may have been partially extended
+            raise
+
+        # Assisted generation can't continue from a cache, speculative sessions keep only their tokens
+        store.store_cache(session, token_ids, cache if self.speculation is None else None)
+        session.history.append((message, answer))
+        return answer
+
+    def _decode_response(self, token_ids) -> str:
+        """
+        Decode prompt + generated tokens and strip the chat template
+        """
+        with metrics.STAGE_DURATION.labels("detokenize").time():
+            response = self.tokenizer.decode(
+                token_ids,
+                skip_special_tokens=True,
+                clean_up_tokenization_spaces=True
+            )
+        return strip_chat_template(response)
+
+    async def _generate_batched(
+        self,
+        input_ids: List[int],
+        prefix_cache: Optional[DynamicCache],
+        max_length: int,
+        temperature: float,
+        top_p: float,
+        top_k: int,
+        streamer: Optional[TextStreamer] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """
+        Submit request to the batch scheduler and decode its result
+        """
+        request = BatchRequest(
+            input_ids=input_ids,
+            prefix_cache=prefix_cache,
+            max_new_tokens=min(max_length, 512),
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            future=asyncio.get_event_loop().create_future(),
+            streamer=streamer,
+            cancel=cancel
+        )
+        output_ids = await self.batch_scheduler.submit(request)
+        if usage is not None:
+            usage.add(len(input_ids), len(output_ids))
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        return self._decode_response(input_ids + output_ids)
+
+    def _prepare_bulk(self, items: List[dict]) -> List[Tuple[List[int], Optional[DynamicCache]]]:
+        """
+        Tokenize all prompts of a bulk run
+        """
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            return [self._prepare_inputs(item["prompt"], item["max_length"]) for item in items]
+
+    async def generate_bulk(
+        self,
+        items: List[dict],
+        batch_size: int,
+        admit: Optional[Callable] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Run many prompts as length-sorted padded batches, yielding (index, response, error) as each batch finishes
+
+        Items are dicts with prompt, max_length, temperature, top_p and top_k; `admit` returns an async
+        context manager held while a batch runs, so interactive requests can get in between batches
+        """
+        if self._prefix_cache_is_stale():
+            await self._run_in_executor(self._refresh_prefix_cache)
+        prepared = await self._run_in_executor(self._prepare_bulk, items)
+
+        # Similar lengths in a batch keep padding waste low
+        order = sorted(range(len(items)), key=lambda index: len(prepared[index][0]))
+        scheduler = BatchScheduler(self, max_batch_size=batch_size, window_ms=0)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batch = [
+                BatchRequest(
+                    input_ids=prepared[index][0],
+                    prefix_cache=prepared[index][1],
+                    max_new_tokens=min(items[index]["max_length"], 512),
+                    temperature=items[index]["temperature"],
+                    top_p=items[index]["top_p"],
+                    top_k=items[index]["top_k"],
+                    cancel=cancel
+                )
+                for index in indices
+            ]
+
+            error = None
+            async with admit() if admit is not None else nullcontext():
+                try:
+                    await self._run_in_executor(scheduler.run_batch, batch)
+                except Exception as e:
+                    print(f"Error during bulk generation: {str(e)}")
+                    error = str(e)
+            if usage is not None:
+                for request in batch:
+                    usage.add(len(request.input_ids), len(request.output_ids))
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+            for index, request in zip(indices, batch):
+                if error is not None:
+                    yield index, None, error
+                else:
+                    yield index, self._decode_response(request.input_ids + request.output_ids), None
+
+    def _sampling_kwargs(self, temperature: float, top_p: float, top_k: int) -> dict:
+        """
+        Sampling arguments for generate(); temperature 0 means deterministic greedy decoding
+        """
+        if temperature == 0:
+            return {"do_sample": False}
+        return {"do_sample": True, "temperature": temperature, "top_p": top_p, "top_k": top_k}
+
+    def _speculative_kwargs(self) -> dict:
+        """
+        Extra generate() arguments for speculative decoding
+        """
+        # Candidates are verified by the target model (speculative sampling for the draft model,
+        # exact match with the target's own sample for prompt lookup), so sampling semantics hold
+        if self.speculative_mode == "draft":
+            return {"assistant_model": self.draft_model}
+        if self.speculative_mode == "prompt_lookup":
+            return {"prompt_lookup_num_tokens": settings.LLM_PROMPT_LOOKUP_TOKENS}
+        return {}
+
+    def speculation_stats(self) -> dict:
+        """
+        Draft acceptance rate and tokens per target forward pass
+        """
+        if self.speculation is None:
+            return {"mode": "off"}
+        return self.speculation.stats(self.speculative_mode)
+
+    def _stopping_criteria(self, cancel: Optional[CancellationToken], timer: Optional[GenerationTimer] = None) -> StoppingCriteriaList:
+        """
+        Stopping criteria that time generate() and end it once the request is cancelled
+        """
+        criteria = StoppingCriteriaList()
+        if timer is not None:
+            criteria.append(timer)
+        if cancel is not None:
+            criteria.append(CancellationCriteria(cancel))
+        return criteria
+
     def _generate_response_sync(
         self,
-        formatted_prompt: str,
+        input_ids: List[int],
+        prefix_cache: Optional[DynamicCache],
         max_length: int,
         temperature: float,
         top_p: float,
-        top_k: int
+        top_k: int,
+        streamer: Optional[TextStreamer] = None,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None
     ) -> str:
         """
         Synchronous generation function to run in thread pool
         """
         try:
-            # Tokenize input
-            inputs = self.tokenizer(
-                formatted_prompt,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=max_length,
-                add_special_tokens=True
-            ).to(self.device)
+            inputs = torch.tensor([input_ids], device=self.device)
+            timer = GenerationTimer()
 
             # Generate with safety limits
+            if self.speculation is not None:
+                self.speculation.start()
             with torch.no_grad():
                 outputs = self.model.generate(
-                    **inputs,
+                    input_ids=inputs,
+                    attention_mask=torch.ones_like(inputs),
+                    # Private copy of the prefix cache, only the user part gets prefilled
+                    past_key_values=copy.deepcopy(prefix_cache) if prefix_cache is not None else None,
                     max_new_tokens=min(max_length, 512),
-                    do_sample=True,
-                    temperature=temperature,
-                    top_p=top_p,
-                    top_k=top_k,
+                    **self._sampling_kwargs(temperature, top_p, top_k),
                     pad_token_id=self.tokenizer.pad_token_id,
                     eos_token_id=self.tokenizer.eos_token_id,
                     repetition_penalty=1.2,
                     length_penalty=1.0,
-                    no_repeat_ngram_size=3
+                    no_repeat_ngram_size=3,
+                    streamer=streamer,  # Pushes tokens out as they are decoded
+                    stopping_criteria=self._stopping_criteria(cancel, timer),
+                    **self._speculative_kwargs()
                 )
+            timer.record(len(input_ids), outputs.shape[-1] - len(input_ids))
+            if usage is not None:
+                usage.add(len(input_ids), outputs.shape[-1] - len(input_ids))
+            if self.speculation is not None:
+                self.speculation.finish(outputs.shape[-1] - len(input_ids))
+            if cancel is not None:
+                cancel.raise_if_cancelled()
 
             # Decode output tokens to text
-            response = self.tokenizer.decode(
-                outputs[0],
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=True
-            )
-            
-            # Clean up response
-            turns = response.split("<start_of_turn>")
-            for turn in turns:
-                if turn.startswith("model"):
-                    response = turn.replace("model", "").strip()
-                    break
-            
-            response = response.split("<end_of_turn>")[0].strip()
-            return response
+            return self._decode_response(outputs[0])
 
+        except GenerationCancelled:
+            if streamer is not None:
+                streamer.end()
+            raise
         except Exception as e:
             print(f"Error during generation: {str(e)}")
             print(f"Current device: {self.device}")
             print(f"Model dtype: {self.model.dtype}")
+            if streamer is not None:
+                streamer.end()  # Unblock the consumer waiting for tokens
             raise
 
     async def generate_response(
@@ -110,41 +757,92 @@ class LLMService:
         temperature: float = 0.7,
         top_p: float = 0.95,
         top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
     ) -> str:
         """
         Asynchronous generate response method
         """
-        formatted_prompt = f"<start_of_turn>system\n{settings.SYSTEM_PROMPT}<end_of_turn>\n<start_of_turn>user\n{prompt}<end_of_turn>\n<start_of_turn>model\nLet me help you with that."
+        if self._prefix_cache_is_stale():
+            await self._run_in_executor(self._refresh_prefix_cache)
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            input_ids, prefix_cache = self._prepare_inputs(prompt, max_length)
+
+        if self.batch_scheduler is not None:
+            return await self._generate_batched(input_ids, prefix_cache, max_length, temperature, top_p, top_k, cancel=cancel, usage=usage)
         
         # Run generation in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            self.executor,
+        response = await self._run_in_executor(
             self._generate_response_sync,
-            formatted_prompt,
+            input_ids,
+            prefix_cache,
             max_length,
             temperature,
             top_p,
-            top_k
+            top_k,
+            None,
+            cancel,
+            usage
         )
         
         return response
 
-    def __del__(self):
+    async def stream_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
         """
-        Cleanup resources on deletion
+        Asynchronous generator yielding text chunks as soon as they are decoded
         """
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True)
+        cancel = cancel or CancellationToken()  # Needed to stop generation if the consumer goes away
+        loop = asyncio.get_event_loop()
+        if self._prefix_cache_is_stale():
+            await self._run_in_executor(self._refresh_prefix_cache)
+        with metrics.STAGE_DURATION.labels("tokenize").time():
+            input_ids, prefix_cache = self._prepare_inputs(prompt, max_length)
 
-# Global model instance
-llm_service: Optional[LLMService] = None
+        streamer = AsyncTextStreamer(
+            self.tokenizer,
+            loop,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=True
+        )
+        # Generation runs in the thread pool (or a batch) and feeds the streamer queue
+        if self.batch_scheduler is not None:
+            generation = asyncio.ensure_future(
+                self._generate_batched(input_ids, prefix_cache, max_length, temperature, top_p, top_k, streamer, cancel, usage)
+            )
+        else:
+            generation = self._run_in_executor(
+                self._generate_response_sync,
+                input_ids,
+                prefix_cache,
+                max_length,
+                temperature,
+                top_p,
+                top_k,
+                streamer,
+                cancel,
+                usage
+            )
 
-def get_llm_service() -> LLMService:
-    """
-    Get or create LLM service instance (singleton pattern)
-    """
-    global llm_service
-    if llm_service is None:
-        llm_service = LLMService()
-    return llm_service 
\ No newline at end of file
+        finished = False
+        try:
+            while True:
+                chunk = await streamer.queue.get()
+                if chunk is None:
+                    finished = True
+                    break
+                yield chunk
+        finally:
+            if not finished and not generation.done():
+                cancel.cancel("stream consumer stopped")  # Don't keep decoding for nobody
+                generation.add_done_callback(lambda future: future.cancelled() or future.exception())  # Nobody awaits it
+
+        await generation  # Re-raise generation errors, if any
@@ -0,0 +1,126 @@
+from typing import Optional  # For type hints
+from fastapi import HTTPException, status  # Not-ready responses from the dependency
+from app.core.config import settings  # Loading options
+import threading  # Background loading
+import time  # Load timing
+
+class ModelStatus:
+    """
+    Load/warm-up state of the model, reported by the readiness endpoint
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = "not_loaded"  # not_loaded -> loading -> warming_up -> ready | failed
+        self.stage = ""  # Human readable current step
+        self.progress = 0.0  # 0..1
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+
+    def update(self, state: Optional[str] = None, stage: Optional[str] = None, progress: Optional[float] = None):
+        with self.lock:
+            if state is not None:
+                self.state = state
+            if stage is not None:
+                self.stage = stage
+            if progress is not None:
+                self.progress = progress
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            elapsed_until = self.ready_at or time.time()
+            return {
+                "state": self.state,
+                "stage": self.stage,
+                "progress": round(self.progress, 2),
+                "error": self.error,
+                "load_seconds": round(elapsed_until - self.started_at, 1) if self.started_at else None,
+            }
+
+# Global model instance
+llm_service = None  # Inference backend or WorkerPoolClient
+model_status = ModelStatus()
+_load_lock = threading.Lock()
+
+def load_llm_service():
+    """
+    Load and warm up the LLM service, tracking progress in model_status
+    """
+    global llm_service
+    with _load_lock:
+        if llm_service is not None:
+            return llm_service
+
+        model_status.started_at = time.time()
+        model_status.update(state="loading", stage="starting", progress=0.0)
+        try:
+            if settings.LLM_WORKER_POOL_ENABLED:
+                # Forward generation to the shared inference worker pool, workers warm up themselves
+                from app.services.worker_pool import WorkerPoolClient
+                service = WorkerPoolClient()
+            else:
+                from app.services.backends import create_backend  # Engine modules are only imported here
+                service = create_backend(
+                    settings.LLM_BACKEND,
+                    on_progress=lambda stage, progress: model_status.update(stage=stage, progress=progress)
+                )
+                if settings.LLM_WARMUP_ENABLED:
+                    model_status.update(state="warming_up", stage="warm-up generations", progress=0.8)
+                    service.warm_up()
+        except Exception as e:
+            print(f"Error loading model: {str(e)}")
+            model_status.error = str(e)
+            model_status.update(state="failed", stage="failed")
+            return None
+
+        llm_service = service
+        model_status.ready_at = time.time()
+        model_status.update(state="ready", stage="ready", progress=1.0)
+        return llm_service
+
+def start_background_loading():
+    """
+    Start model loading in a daemon thread so the server can accept connections meanwhile
+    """
+    if model_status.state == "not_loaded":
+        model_status.update(state="loading", stage="queued")
+        threading.Thread(target=load_llm_service, name="llm-loader", daemon=True).start()
+
+def close_llm_service():
+    """
+    Release resources held outside this process (the worker pool client's result queue)
+    """
+    if llm_service is not None and hasattr(llm_service, "close"):
+        llm_service.close()
+
+def get_llm_service():
+    """
+    Get or create LLM service instance (singleton pattern)
+    """
+    if llm_service is not None:
+        return llm_service
+
+    if model_status.state in ("loading", "warming_up"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model is loading ({model_status.stage})",
+            headers={"Retry-After": "10"},
+        )
+    if model_status.state == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model failed to load: {model_status.error}",
+        )
+
+    # Preloading disabled, fall back to loading on first use
+    service = load_llm_service()
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model failed to load: {model_status.error}",
+        )
+    return service 
\ No newline at end of file
@@ -0,0 +1,134 @@
+from dataclasses import dataclass  # Build result
+from typing import Callable, List, Optional, Tuple  # For type hints
+from app.core import metrics  # Trimmed token counter
+import threading  # Prefix rebuild lock
+
+@dataclass
+class BuiltPrompt:
+    """
+    Token ids of a prompt with the counts used for accounting
+    """
+    input_ids: List[int]
+    system_tokens: int  # Constant prefix, never trimmed
+    history_tokens: int  # Earlier chat turns kept
+    user_tokens: int  # Current message kept
+    trimmed_tokens: int  # Dropped to fit the budget
+
+    @property
+    def prompt_tokens(self) -> int:
+        return len(self.input_ids)
+
+class PromptBuilder:
+    """
+    Builds chat template token ids within a context budget: system prefix ids are tokenized once,
+    only user and history text is tokenized per request, and only user and history text is trimmed
+    """
+    def __init__(self, tokenizer, system_prompt: Callable[[], str], context_tokens: int):
+        self.tokenizer = tokenizer
+        self.system_prompt = system_prompt  # Read on every build, the prompt can change at runtime
+        self.context_tokens = context_tokens
+        self._lock = threading.Lock()
+        self._cached_for: Optional[str] = None
+        self._prefix_ids: List[int] = []
+        self._turn_ids: dict = {}  # Constant template pieces -> ids
+
+    def system_prefix(self, system_prompt: str) -> str:
+        return f"<start_of_turn>system\n{system_prompt}<end_of_turn>\n<start_of_turn>user\n"
+
+    def prefix_ids(self) -> List[int]:
+        """
+        Token ids of the system prefix (BOS included), tokenized once per system prompt
+        """
+        system_prompt = self.system_prompt()
+        with self._lock:
+            if self._cached_for != system_prompt:
+                self._prefix_ids = self.tokenizer(self.system_prefix(system_prompt), add_special_tokens=True)["input_ids"]
+                self._cached_for = system_prompt
+            return self._prefix_ids
+
+    def _ids(self, text: str) -> List[int]:
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    def _template_ids(self, text: str) -> List[int]:
+        if text not in self._turn_ids:
+            self._turn_ids[text] = self._ids(text)
+        return self._turn_ids[text]
+
+    def input_budget(self, max_new_tokens: int) -> int:
+        return max(0, self.context_tokens - max_new_tokens)
+
+    @staticmethod
+    def _trim_middle(ids: List[int], keep: int) -> List[int]:
+        """
+        Keep the start (usually the instruction) and the end (usually the question) of a long text
+        """
+        if len(ids) <= keep:
+            return ids
+        if keep <= 0:
+            return []
+        head = keep // 2
+        return ids[:head] + ids[len(ids) - (keep - head):]
+
+    def build(self, prompt: str, max_new_tokens: int, prefix_ids: Optional[List[int]] = None, suffix: str = "") -> BuiltPrompt:
+        """
+        Single-turn prompt: system prefix + user text + template suffix opening the model turn
+        """
+        prefix_ids = prefix_ids if prefix_ids is not None else self.prefix_ids()
+        suffix_ids = self._template_ids(f"<end_of_turn>\n<start_of_turn>model\n{suffix}")
+        user_ids = self._ids(prompt)
+
+        room = self.input_budget(max_new_tokens) - len(prefix_ids) - len(suffix_ids)
+        kept = self._trim_middle(user_ids, room)
+        trimmed = len(user_ids) - len(kept)
+        if trimmed:
+            metrics.PROMPT_TRIMMED_TOKENS.inc(trimmed)
+        return BuiltPrompt(
+            input_ids=prefix_ids + kept + suffix_ids,
+            system_tokens=len(prefix_ids),
+            history_tokens=0,
+            user_tokens=len(kept),
+            trimmed_tokens=trimmed
+        )
+
+    def build_chat(
+        self,
+        history: List[Tuple[str, str]],
+        message: str,
+        max_new_tokens: int,
+        prefix_ids: Optional[List[int]] = None
+    ) -> BuiltPrompt:
+        """
+        Conversation prompt: oldest exchanges are dropped first, then the new message is trimmed
+        """
+        prefix_ids = prefix_ids if prefix_ids is not None else self.prefix_ids()
+        suffix_ids = self._template_ids("<end_of_turn>\n<start_of_turn>model\n")
+        message_ids = self._ids(message)
+        exchanges = [
+            self._ids(f"{user_message}<end_of_turn>\n<start_of_turn>model\n{answer}<end_of_turn>\n<start_of_turn>user\n")
+            for user_message, answer in history
+        ]
+
+        room = self.input_budget(max_new_tokens) - len(prefix_ids) - len(suffix_ids)
+        kept_message = self._trim_middle(message_ids, room)
+        room -= len(kept_message)
+        trimmed = len(message_ids) - len(kept_message)
+
+        # Newest exchanges first, as many as fit
+        kept_exchanges: List[List[int]] = []
+        for ids in reversed(exchanges):
+            if len(ids) > room:
+                break
+            kept_exchanges.insert(0, ids)
+            room -= len(ids)
+        trimmed += sum(len(ids) for ids in exchanges[:len(exchanges) - len(kept_exchanges)])
+        if trimmed:
+            metrics.PROMPT_TRIMMED_TOKENS.inc(trimmed)
+
+        history_ids = [token for ids in kept_exchanges for token in ids]
+        return BuiltPrompt(
+            input_ids=prefix_ids + history_ids + kept_message + suffix_ids,
+            system_tokens=len(prefix_ids),
+            history_tokens=len(history_ids),
+            user_tokens=len(kept_message),
+            trimmed_tokens=trimmed
+        )
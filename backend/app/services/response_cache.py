@@ -0,0 +1,127 @@
+from typing import Optional  # Type hints
+from app.core.cache import TTLCache  # In-process LRU + TTL storage
+from app.core.config import settings  # Cache configuration
+import hashlib  # Cache keys
+import json  # Stable key serialization
+import re  # Prompt normalization
+
+class LocalCacheBackend:
+    """
+    In-process cache backend, one copy per API worker
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.cache = TTLCache(max_entries, ttl_seconds)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: str):
+        self.cache.set(key, value)
+
+    @property
+    def evictions(self) -> int:
+        return self.cache.evictions
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+class RedisCacheBackend:
+    """
+    Shared cache backend, lets all API workers and hosts reuse each other's responses
+    """
+    def __init__(self, url: str, ttl_seconds: float):
+        import redis.asyncio as redis  # Optional dependency, only needed for this backend
+        self.client = redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds)
+        self.evictions = 0  # Redis evicts on its own (maxmemory-policy allkeys-lru)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(f"llm:response:{key}")
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str):
+        await self.client.set(f"llm:response:{key}", value, ex=self.ttl_seconds)
+
+    def __len__(self) -> int:
+        return 0  # Unknown without a round-trip
+
+class ResponseCache:
+    """
+    Cache of generated responses keyed on normalized prompt, sampling parameters and system prompt
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(temperature: float, opt_in: bool) -> bool:
+        """
+        Deterministic (greedy) requests are always cacheable, sampled ones only when the client opts in
+        """
+        return settings.RESPONSE_CACHE_ENABLED and (temperature == 0 or opt_in)
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+    def make_key(self, kind: str, prompt: str, **params) -> str:
+        """
+        Build cache key; kind separates full responses from streamed ones
+        """
+        payload = {
+            "kind": kind,
+            "prompt": self.normalize_prompt(prompt),
+            "params": params,
+            "system_prompt": hashlib.sha256(settings.SYSTEM_PROMPT.encode()).hexdigest(),
+            "backend": settings.LLM_BACKEND.lower(),  # Engines don't produce identical answers
+            "model": settings.LLM_ONNX_MODEL_PATH if settings.LLM_BACKEND.lower() == "onnxruntime" else settings.LLM_MODEL_PATH,
+            "precision": settings.LLM_PRECISION,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            print(f"Response cache lookup failed: {str(e)}")  # Cache problems never fail a request
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"Response cache store failed: {str(e)}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.RESPONSE_CACHE_ENABLED,
+            "backend": settings.RESPONSE_CACHE_BACKEND,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.backend.evictions,
+        }
+
+# Global cache instance
+response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get or create response cache instance (singleton pattern)
+    """
+    global response_cache
+    if response_cache is None:
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            backend = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+        else:
+            backend = LocalCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+        response_cache = ResponseCache(backend)
+    return response_cache
\ No newline at end of file
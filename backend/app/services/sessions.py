@@ -0,0 +1,163 @@
+from collections import OrderedDict  # LRU ordering of sessions
+from typing import List, Optional, Tuple  # For type hints
+from app.core.config import settings  # Session limits
+import asyncio  # Per-session turn lock
+import time  # Idle tracking
+import uuid  # Session ids
+
+def cache_nbytes(cache) -> int:
+    """
+    Approximate memory held by a KV cache
+    """
+    if cache is None:
+        return 0
+    if hasattr(cache, "layers"):  # Newer transformers: per-layer cache objects
+        tensors = [t for layer in cache.layers for t in (getattr(layer, "keys", None), getattr(layer, "values", None))]
+    else:
+        tensors = list(getattr(cache, "key_cache", [])) + list(getattr(cache, "value_cache", []))
+    return sum(t.numel() * t.element_size() for t in tensors if hasattr(t, "numel"))
+
+class ChatSession:
+    """
+    Server-side conversation: message history plus the KV cache of everything said so far
+    """
+    def __init__(self, user_id: int):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.history: List[Tuple[str, str]] = []  # (user message, model answer) pairs
+        self.token_ids: List[int] = []  # Tokens the cache was built from
+        self.cache = None  # past_key_values, None after eviction
+        self.cache_bytes = 0
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()  # One turn at a time per session
+
+    def to_messages(self) -> List[dict]:
+        messages = []
+        for user_message, answer in self.history:
+            messages.append({"role": "user", "content": user_message})
+            messages.append({"role": "model", "content": answer})
+        return messages
+
+class SessionStore:
+    """
+    Chat sessions with a global memory budget for their KV caches (LRU and idle-time eviction)
+    """
+    def __init__(
+        self,
+        cache_budget_bytes: int,
+        cache_idle_seconds: float,
+        session_ttl_seconds: float,
+        max_sessions: int,
+        max_sessions_per_user: int
+    ):
+        self.cache_budget_bytes = cache_budget_bytes
+        self.cache_idle_seconds = cache_idle_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_sessions_per_user = max_sessions_per_user
+        self.sessions: "OrderedDict[str, ChatSession]" = OrderedDict()  # Least recently used first
+        self.cache_bytes = 0
+        self.cache_evictions = 0
+
+    def create(self, user_id: int) -> ChatSession:
+        self._expire()
+        # A user at the limit replaces their own least recently used session, not other users' ones
+        own = [session for session in self.sessions.values() if session.user_id == user_id]
+        for oldest in own[:max(0, len(own) - self.max_sessions_per_user + 1)]:
+            self.delete(oldest)
+        while len(self.sessions) >= self.max_sessions:
+            _, oldest = self.sessions.popitem(last=False)
+            self._drop_cache(oldest)
+        session = ChatSession(user_id)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str, user_id: int) -> Optional[ChatSession]:
+        """
+        Look up a session owned by the user and mark it as recently used
+        """
+        self._expire()
+        session = self.sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session: ChatSession):
+        self._drop_cache(session)
+        self.sessions.pop(session.id, None)
+
+    def store_cache(self, session: ChatSession, token_ids: List[int], cache):
+        """
+        Keep the session's new cache and evict other caches until the budget fits
+        """
+        self._drop_cache(session)
+        if self.sessions.get(session.id) is not session:
+            return  # Deleted or evicted while the turn was running, nobody can use the cache
+        session.token_ids = token_ids
+        session.cache = cache
+        session.cache_bytes = cache_nbytes(cache)
+        self.cache_bytes += session.cache_bytes
+
+        for other in list(self.sessions.values()):  # Least recently used first
+            if self.cache_bytes <= self.cache_budget_bytes:
+                break
+            if other is not session and other.cache is not None and not other.lock.locked():
+                self._drop_cache(other)
+                self.cache_evictions += 1
+
+        if self.cache_bytes > self.cache_budget_bytes:
+            self._drop_cache(session)  # Doesn't fit even alone, next turn re-prefills
+            self.cache_evictions += 1
+
+    def drop_cache(self, session: ChatSession):
+        self._drop_cache(session)
+
+    def _drop_cache(self, session: ChatSession):
+        self.cache_bytes -= session.cache_bytes
+        session.cache = None
+        session.cache_bytes = 0
+        session.token_ids = []
+
+    def _expire(self):
+        """
+        Drop caches of idle sessions and forget sessions past their TTL
+        """
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            if session.lock.locked():
+                continue
+            idle = now - session.last_used
+            if idle > self.session_ttl_seconds:
+                self.delete(session)
+            elif idle > self.cache_idle_seconds and session.cache is not None:
+                self._drop_cache(session)
+                self.cache_evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "cached_sessions": sum(1 for session in self.sessions.values() if session.cache is not None),
+            "cache_mb": round(self.cache_bytes / 1024 ** 2, 1),
+            "cache_budget_mb": round(self.cache_budget_bytes / 1024 ** 2, 1),
+            "cache_evictions": self.cache_evictions,
+        }
+
+# Global session store
+session_store: Optional[SessionStore] = None
+
+def get_session_store() -> SessionStore:
+    """
+    Get or create session store instance (singleton pattern)
+    """
+    global session_store
+    if session_store is None:
+        session_store = SessionStore(
+            cache_budget_bytes=int(settings.LLM_SESSION_CACHE_BUDGET_MB * 1024 ** 2),
+            cache_idle_seconds=settings.LLM_SESSION_CACHE_IDLE_SECONDS,
+            session_ttl_seconds=settings.LLM_SESSION_TTL_SECONDS,
+            max_sessions=settings.LLM_MAX_SESSIONS,
+            max_sessions_per_user=settings.LLM_MAX_SESSIONS_PER_USER
+        )
+    return session_store
\ No newline at end of file
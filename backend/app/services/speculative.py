@@ -0,0 +1,63 @@
+from typing import Optional  # For type hints
+import threading  # Per-thread candidate counters
+
+class SpeculationTracker:
+    """
+    Measures how many drafted tokens the target model accepts by counting its forward passes
+    """
+    def __init__(self, model):
+        self.local = threading.local()  # Generations run concurrently in executor threads
+        self.lock = threading.Lock()
+        self.generations = 0
+        self.generated_tokens = 0
+        self.target_forwards = 0
+        self.candidate_tokens = 0
+        self.accepted_tokens = 0
+        model.register_forward_pre_hook(self._count_forward, with_kwargs=True)
+
+    def _count_forward(self, module, args, kwargs):
+        candidates = getattr(self.local, "candidates", None)
+        if candidates is None:
+            return  # Not inside a tracked generation
+        # A verification forward keeps the logits of its candidates plus one for the target's own token
+        logits_to_keep = kwargs.get("logits_to_keep")
+        candidates.append(logits_to_keep - 1 if isinstance(logits_to_keep, int) and logits_to_keep > 0 else 0)
+
+    def start(self):
+        """
+        Begin counting forwards of the current thread's generation
+        """
+        self.local.candidates = []
+
+    def finish(self, new_tokens: int):
+        """
+        Fold the current thread's generation into the totals
+        """
+        counts = getattr(self.local, "candidates", None)
+        self.local.candidates = None
+        if not counts:
+            return
+
+        # Each forward yields the accepted candidates plus one token of its own
+        forwards = len(counts)
+        candidates = sum(counts)
+        accepted = max(0, min(new_tokens - forwards, candidates))
+        with self.lock:
+            self.generations += 1
+            self.generated_tokens += new_tokens
+            self.target_forwards += forwards
+            self.candidate_tokens += candidates
+            self.accepted_tokens += accepted
+
+    def stats(self, mode: Optional[str] = None) -> dict:
+        with self.lock:
+            return {
+                "mode": mode,
+                "generations": self.generations,
+                "generated_tokens": self.generated_tokens,
+                "target_forwards": self.target_forwards,
+                "candidate_tokens": self.candidate_tokens,
+                "accepted_tokens": self.accepted_tokens,
+                "acceptance_rate": round(self.accepted_tokens / self.candidate_tokens, 3) if self.candidate_tokens else None,
+                "tokens_per_forward": round(self.generated_tokens / self.target_forwards, 2) if self.target_forwards else None,
+            }
\ No newline at end of file
@@ -0,0 +1,127 @@
+from dataclasses import dataclass, field  # Layout container
+from typing import List, Optional  # For type hints
+from app.core.config import settings  # Threading settings
+import itertools  # Slot numbering
+import os  # CPU affinity and topology
+
+def available_cores() -> List[int]:
+    """
+    CPUs this process may run on (respects taskset/cgroup affinity)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def physical_cores(cores: List[int]) -> List[int]:
+    """
+    One logical CPU per physical core; SMT siblings share the core's vector units
+    """
+    seen = set()
+    result = []
+    for cpu in cores:
+        try:
+            with open(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list") as f:
+                siblings = f.read().strip()
+        except OSError:
+            return cores  # Topology unknown, use every CPU
+        if siblings not in seen:
+            seen.add(siblings)
+            result.append(cpu)
+    return result
+
+def generation_slots() -> int:
+    """
+    Generations run at once per process: one batch when batching, otherwise LLM_GENERATION_SLOTS (default 2)
+    """
+    if settings.LLM_GENERATION_SLOTS > 0:
+        return settings.LLM_GENERATION_SLOTS
+    return 1 if settings.LLM_BATCHING_ENABLED else 2
+
+@dataclass
+class ThreadLayout:
+    """
+    How the CPU is split between concurrent generation slots
+    """
+    slots: int
+    threads_per_slot: int
+    interop_threads: int
+    pin: bool
+    core_sets: List[List[int]] = field(default_factory=list)  # CPUs of each slot
+
+    def describe(self) -> str:
+        cores = "; ".join(f"slot {i}: {','.join(map(str, cpus))}" for i, cpus in enumerate(self.core_sets))
+        pinned = "pinned" if self.pin else "not pinned"
+        return (
+            f"{self.slots} generation slots x {self.threads_per_slot} threads, "
+            f"{self.interop_threads} inter-op threads, {pinned} ({cores})"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "slots": self.slots,
+            "threads_per_slot": self.threads_per_slot,
+            "interop_threads": self.interop_threads,
+            "pinned": self.pin,
+            "core_sets": self.core_sets,
+        }
+
+def usable_cores(cores: Optional[List[int]] = None) -> List[int]:
+    cores = cores if cores is not None else available_cores()
+    return cores if settings.LLM_THREADS_USE_SMT else physical_cores(cores)
+
+def split_cores(cores: List[int], parts: int, per_part: Optional[int] = None) -> List[List[int]]:
+    """
+    Consecutive CPUs per part (neighbouring cores usually share caches), wrapping around if oversubscribed
+    """
+    per_part = min(per_part or max(1, len(cores) // parts), len(cores))
+    return [[cores[(part * per_part + i) % len(cores)] for i in range(per_part)] for part in range(parts)]
+
+def plan_layout(slots: int, cores: Optional[List[int]] = None) -> ThreadLayout:
+    """
+    Split the cores evenly between slots so concurrent generations don't oversubscribe the CPU
+    """
+    cores = usable_cores(cores)
+    slots = max(1, slots)
+    threads_per_slot = settings.LLM_THREADS_PER_SLOT or max(1, len(cores) // slots)
+    return ThreadLayout(
+        slots=slots,
+        threads_per_slot=threads_per_slot,
+        interop_threads=max(1, settings.LLM_INTEROP_THREADS),
+        pin=settings.LLM_PIN_THREADS and hasattr(os, "sched_setaffinity"),
+        core_sets=split_cores(cores, slots, threads_per_slot)
+    )
+
+def pin_current_thread(cpus: List[int]):
+    """
+    Restrict the calling thread (and threads it starts, e.g. OpenMP workers) to the given CPUs
+    """
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        print(f"Could not pin thread to CPUs {cpus}: {str(e)}")
+
+def configure_process(layout: ThreadLayout):
+    """
+    Process-wide torch settings; the inter-op pool can only be sized before its first use
+    """
+    import torch  # Only where the model runs
+    try:
+        torch.set_num_interop_threads(layout.interop_threads)
+    except RuntimeError:
+        pass  # Already started, keep its size
+    torch.set_num_threads(layout.threads_per_slot)
+
+class SlotInitializer:
+    """
+    ThreadPoolExecutor initializer: each executor thread becomes one slot with its own thread count and cores
+    """
+    def __init__(self, layout: ThreadLayout):
+        self.layout = layout
+        self.counter = itertools.count()
+
+    def __call__(self):
+        import torch  # Only where the model runs
+        slot = next(self.counter) % self.layout.slots
+        if self.layout.pin:
+            pin_current_thread(self.layout.core_sets[slot])
+        torch.set_num_threads(self.layout.threads_per_slot)  # OpenMP team size of this thread
@@ -0,0 +1,184 @@
+from dataclasses import dataclass  # Usage container
+from datetime import date, datetime, timedelta, timezone  # UTC days
+from typing import Dict, Optional, Tuple  # For type hints
+from sqlalchemy import select, update  # Query construction
+from sqlalchemy.exc import IntegrityError  # Concurrent inserts from other processes
+from app.core.config import settings  # Quota and flush settings
+from app.db.session import AsyncSessionLocal  # Async database sessions
+from app.models.usage import Usage  # Daily usage table
+from app.services.admission import AdmissionRejected  # 429 with Retry-After
+import asyncio  # Flush loop
+
+@dataclass
+class TokenUsage:
+    """
+    Tokens consumed by one request, filled in by the LLM service
+    """
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+def seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(1, int((tomorrow - now).total_seconds()))
+
+class UsageTracker:
+    """
+    In-memory per-user daily token counters, written to the database in periodic batches (write-behind)
+    """
+    def __init__(self, daily_quota: int, flush_interval: float):
+        self.daily_quota = daily_quota
+        self.flush_interval = flush_interval
+        self.totals: Dict[Tuple[int, date], list] = {}  # (user, day) -> [prompt, completion, requests], DB + pending
+        self.pending: Dict[Tuple[int, date], list] = {}  # Not yet written to the DB
+        self.flush_lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flush_errors = 0
+
+    async def _load(self, key: Tuple[int, date]) -> list:
+        """
+        Day totals from the DB, loaded once per user and day
+        """
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(select(Usage).where(Usage.user_id == key[0], Usage.day == key[1]))).scalars().first()
+        stored = [row.prompt_tokens, row.completion_tokens, row.requests] if row is not None else [0, 0, 0]
+        pending = self.pending.get(key, [0, 0, 0])
+        return [s + p for s, p in zip(stored, pending)]
+
+    async def get_today(self, user_id: int) -> list:
+        key = (user_id, utc_today())
+        if key not in self.totals:
+            self.totals[key] = await self._load(key)
+        return self.totals[key]
+
+    async def check_quota(self, user_id: int):
+        """
+        Reject the request before generation if the user used up today's tokens
+        """
+        if self.daily_quota <= 0:
+            return
+        prompt_tokens, completion_tokens, _ = await self.get_today(user_id)
+        if prompt_tokens + completion_tokens >= self.daily_quota:
+            raise AdmissionRejected(429, "Daily token quota exceeded", seconds_until_tomorrow())
+
+    def record(self, user_id: int, usage: TokenUsage):
+        """
+        Count a finished (or cancelled) generation; no DB access
+        """
+        if usage.total_tokens == 0:
+            return
+        key = (user_id, utc_today())
+        for counters in (self.pending.setdefault(key, [0, 0, 0]), self.totals.get(key)):
+            if counters is not None:
+                counters[0] += usage.prompt_tokens
+                counters[1] += usage.completion_tokens
+                counters[2] += 1
+
+    async def flush(self):
+        """
+        Write pending counters in one transaction and refresh totals (other processes write too)
+        """
+        async with self.flush_lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            try:
+                async with AsyncSessionLocal() as db:
+                    for (user_id, day), (prompt_tokens, completion_tokens, requests) in pending.items():
+                        await self._add_row(db, user_id, day, prompt_tokens, completion_tokens, requests)
+                    await db.commit()
+            except Exception as e:
+                # Keep the counters for the next attempt
+                print(f"Usage flush failed: {str(e)}")
+                self.flush_errors += 1
+                for key, counters in pending.items():
+                    merged = self.pending.setdefault(key, [0, 0, 0])
+                    for i, value in enumerate(counters):
+                        merged[i] += value
+                return
+            self.flushes += 1
+
+            # Drop totals of past days, reload flushed ones on next use
+            today = utc_today()
+            for key in list(self.totals):
+                if key[1] != today or key in pending:
+                    del self.totals[key]
+
+    async def _add_row(self, db, user_id: int, day: date, prompt_tokens: int, completion_tokens: int, requests: int):
+        """
+        Increment the (user, day) row, creating it if needed
+        """
+        values = {
+            "prompt_tokens": Usage.prompt_tokens + prompt_tokens,
+            "completion_tokens": Usage.completion_tokens + completion_tokens,
+            "requests": Usage.requests + requests,
+        }
+        statement = update(Usage).where(Usage.user_id == user_id, Usage.day == day).values(**values)
+        if (await db.execute(statement)).rowcount:
+            return
+        try:
+            async with db.begin_nested():
+                db.add(Usage(
+                    user_id=user_id,
+                    day=day,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    requests=requests
+                ))
+        except IntegrityError:
+            await db.execute(statement)  # Another process created the row first
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """
+        Stop the flush loop and write what is left
+        """
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
+
+    async def user_stats(self, user_id: int) -> dict:
+        prompt_tokens, completion_tokens, requests = await self.get_today(user_id)
+        used = prompt_tokens + completion_tokens
+        return {
+            "day": utc_today().isoformat(),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": used,
+            "requests": requests,
+            "daily_quota": self.daily_quota or None,
+            "remaining": max(0, self.daily_quota - used) if self.daily_quota > 0 else None,
+        }
+
+# Global usage tracker
+usage_tracker: Optional[UsageTracker] = None
+
+def get_usage_tracker() -> UsageTracker:
+    """
+    Get or create usage tracker instance (singleton pattern)
+    """
+    global usage_tracker
+    if usage_tracker is None:
+        usage_tracker = UsageTracker(settings.USAGE_DAILY_TOKEN_QUOTA, settings.USAGE_FLUSH_INTERVAL_SECONDS)
+    return usage_tracker
@@ -0,0 +1,396 @@
+from multiprocessing.managers import BaseManager  # Local IPC between API and inference processes
+from typing import AsyncIterator, Dict, Optional, Tuple  # For type hints
+from app.core.config import settings  # Pool configuration
+from app.services.cancellation import CancellationToken, GenerationCancelled  # Cross-process cancellation
+from app.services.usage import TokenUsage  # Token counts sent back with results
+import multiprocessing  # Inference worker processes
+import atexit  # Release the result queue on exit
+import threading  # Result routing threads
+import asyncio  # For async operations
+import queue  # Per-client result queues
+import uuid  # Request and client ids
+import time  # Cancellation polling
+import os  # OS utilities
+
+# Longer than any request can wait and run, so a live request never loses its cancellation
+CANCELLED_ID_TTL_SECONDS = max(600.0, 2 * settings.LLM_REQUEST_TIMEOUT_SECONDS)
+
+class WorkerPoolManager(BaseManager):
+    """
+    Manager exposing the pool request queue and per-client result queues over a local socket
+    """
+
+class CancelledRequests:
+    """
+    Ids of requests whose client gave up, shared by API clients and workers through the manager
+
+    Workers discard an id when its request ends; ids added after that (the client gave up just as
+    the result arrived) expire after CANCELLED_ID_TTL_SECONDS
+    """
+    def __init__(self):
+        self.ids: Dict[str, float] = {}  # request id -> time added
+        self.lock = threading.Lock()
+        self.last_pruned = time.monotonic()
+
+    def add(self, request_id: str):
+        with self.lock:
+            now = time.monotonic()
+            self.ids[request_id] = now
+            if now - self.last_pruned > 60:
+                self.ids = {key: added for key, added in self.ids.items() if now - added < CANCELLED_ID_TTL_SECONDS}
+                self.last_pruned = now
+
+    def discard(self, request_id: str):
+        with self.lock:
+            self.ids.pop(request_id, None)
+
+    def contains(self, request_id: str) -> bool:
+        with self.lock:
+            return request_id in self.ids
+
+# Server-side state, only populated inside the pool process
+_request_queue = None
+_client_queues: Dict[str, queue.Queue] = {}
+_client_queues_lock = threading.Lock()
+_cancelled_requests = CancelledRequests()
+
+def _get_request_queue():
+    return _request_queue
+
+def _get_result_queue(client_id: str) -> queue.Queue:
+    with _client_queues_lock:
+        return _client_queues.setdefault(client_id, queue.Queue())
+
+def _release_result_queue(client_id: str):
+    with _client_queues_lock:
+        results = _client_queues.pop(client_id, None)
+    if results is not None:
+        results.put(None)  # Stops the client's reader thread
+
+def _get_cancelled_requests() -> CancelledRequests:
+    return _cancelled_requests
+
+WorkerPoolManager.register("get_request_queue", callable=_get_request_queue)
+WorkerPoolManager.register("get_result_queue", callable=_get_result_queue)
+WorkerPoolManager.register("release_result_queue", callable=_release_result_queue)
+WorkerPoolManager.register("get_cancelled_requests", callable=_get_cancelled_requests)
+
+def _pool_address() -> Tuple[str, int]:
+    return settings.LLM_WORKER_POOL_HOST, settings.LLM_WORKER_POOL_PORT
+
+def _authkey() -> bytes:
+    """
+    Shared secret of the pool socket; managers unpickle what they receive, so there is no default
+    """
+    authkey = settings.LLM_WORKER_POOL_AUTHKEY
+    if len(authkey) < 16:
+        raise RuntimeError(
+            "LLM_WORKER_POOL_AUTHKEY must be set to a secret of at least 16 characters for the worker pool, "
+            "e.g. python -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    return authkey.encode()
+
+class RemoteCancellationToken(CancellationToken):
+    """
+    Cancellation token of a forwarded request, also cancelled when its client reports a disconnect
+    """
+    def __init__(self, cancelled_requests, request_id: str, timeout_seconds: Optional[float]):
+        super().__init__(timeout_seconds)
+        self.cancelled_requests = cancelled_requests
+        self.request_id = request_id
+        self.next_check = 0.0
+
+    @property
+    def is_cancelled(self) -> bool:
+        # Checked after every token, so only ask the manager a few times per second
+        if not self.event.is_set() and time.monotonic() >= self.next_check:
+            self.next_check = time.monotonic() + 0.25
+            if self.cancelled_requests.contains(self.request_id):
+                self.cancel("client disconnected")
+        return super().is_cancelled
+
+async def _handle_request(service, message, result_queue, cancelled_requests):
+    """
+    Run one forwarded request and send its events back to the owning client
+    """
+    client_id, request_id, kind, kwargs = message
+    cancel = RemoteCancellationToken(cancelled_requests, request_id, kwargs.pop("timeout_seconds", None))
+    usage = TokenUsage()
+    try:
+        if kind == "stream":
+            async for chunk in service.stream_response(**kwargs, cancel=cancel, usage=usage):
+                result_queue.put((client_id, request_id, "token", chunk))
+            result_queue.put((client_id, request_id, "done", (None, usage.prompt_tokens, usage.completion_tokens)))
+        else:
+            response = await service.generate_response(**kwargs, cancel=cancel, usage=usage)
+            result_queue.put((client_id, request_id, "done", (response, usage.prompt_tokens, usage.completion_tokens)))
+    except GenerationCancelled as e:
+        result_queue.put((client_id, request_id, "cancelled", e.reason))
+    except Exception as e:
+        result_queue.put((client_id, request_id, "error", str(e)))
+    finally:
+        cancelled_requests.discard(request_id)
+
+async def _serve_requests(service, request_queue, result_queue, cancelled_requests, concurrency: int):
+    """
+    Worker event loop: pull requests while there is a free slot
+    """
+    loop = asyncio.get_event_loop()
+    slots = asyncio.Semaphore(concurrency)
+    while True:
+        await slots.acquire()
+        message = await loop.run_in_executor(None, request_queue.get)
+        if message is None:
+            break  # Shutdown marker
+
+        async def run(message=message):
+            try:
+                await _handle_request(service, message, result_queue, cancelled_requests)
+            finally:
+                slots.release()
+        asyncio.ensure_future(run())
+
+def _worker_main(worker_id: int, weights_path: Optional[str], request_queue, result_queue):
+    """
+    Entry point of an inference worker process
+    """
+    # Each worker gets its share of the cores, split again between its generation slots
+    from app.services.threading_policy import pin_current_thread, split_cores, usable_cores
+    cores = split_cores(usable_cores(), settings.LLM_WORKER_POOL_SIZE)[worker_id]
+    if settings.LLM_PIN_THREADS and hasattr(os, "sched_setaffinity"):
+        pin_current_thread(cores)  # Before torch starts any threads, so they inherit it
+
+    from app.services.backends import create_backend  # Imports torch (or onnxruntime) in the child only
+    service = create_backend(settings.LLM_BACKEND, cpu_cores=cores, mmap_weights_path=weights_path)
+    if settings.LLM_WARMUP_ENABLED:
+        service.warm_up()
+    print(f"Inference worker {worker_id} ready (pid {os.getpid()})")
+
+    # Workers are manager clients too, for the shared cancellation set
+    manager = WorkerPoolManager(address=_pool_address(), authkey=_authkey())
+    for attempt in range(30):
+        try:
+            manager.connect()
+            break
+        except ConnectionError:
+            time.sleep(1)  # Pool server may not be listening yet
+    else:
+        raise RuntimeError(f"Inference worker {worker_id} could not connect to the pool manager at {_pool_address()}")
+    cancelled_requests = manager.get_cancelled_requests()
+
+    # With batching on, a worker keeps several requests in flight so they can share a batch
+    concurrency = settings.LLM_MAX_BATCH_SIZE if settings.LLM_BATCHING_ENABLED else 1
+    asyncio.run(_serve_requests(service, request_queue, result_queue, cancelled_requests, concurrency))
+
+def _route_results(result_queue):
+    """
+    Move worker results into the queue of the client that sent the request
+    """
+    while True:
+        client_id, request_id, event, payload = result_queue.get()
+        _get_result_queue(client_id).put((request_id, event, payload))
+
+def serve_worker_pool():
+    """
+    Start inference workers and serve the IPC manager (blocks forever)
+    """
+    global _request_queue
+    authkey = _authkey()  # Fail before spawning workers
+    # Export once up front, so transformers workers only ever map the file
+    weights_path = None
+    if settings.LLM_BACKEND.lower() == "transformers":
+        from app.services.llm import export_mmap_weights
+        precision = settings.LLM_PRECISION.lower()
+        weights_path = export_mmap_weights(settings.LLM_MODEL_PATH, "float32" if precision == "int8" else precision)
+
+    context = multiprocessing.get_context("spawn")  # Fresh interpreters, no forked torch state
+    _request_queue = context.Queue()
+    result_queue = context.Queue()
+
+    workers = []
+    for worker_id in range(settings.LLM_WORKER_POOL_SIZE):
+        worker = context.Process(
+            target=_worker_main,
+            args=(worker_id, weights_path, _request_queue, result_queue),
+            daemon=True
+        )
+        worker.start()
+        workers.append(worker)
+
+    threading.Thread(target=_route_results, args=(result_queue,), daemon=True).start()
+
+    manager = WorkerPoolManager(address=_pool_address(), authkey=authkey)
+    server = manager.get_server()
+    print(f"Inference worker pool listening on {_pool_address()} with {len(workers)} workers")
+    try:
+        server.serve_forever()
+    finally:
+        for _ in workers:
+            _request_queue.put(None)
+
+class WorkerPoolClient:
+    """
+    Drop-in replacement for LLMService that forwards requests to the worker pool
+    """
+    def __init__(self):
+        self.manager = WorkerPoolManager(address=_pool_address(), authkey=_authkey())
+        self.manager.connect()
+        self.client_id = uuid.uuid4().hex
+        self.requests = self.manager.get_request_queue()
+        self.results = self.manager.get_result_queue(self.client_id)
+        self.cancelled_requests = self.manager.get_cancelled_requests()
+
+        # request id -> (event loop, queue) of the waiting coroutine
+        self.pending: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self.reader = threading.Thread(target=self._read_results, daemon=True)
+        self.reader.start()
+        self.closed = False
+        atexit.register(self.close)  # Also release the queue if the process exits without a clean shutdown
+        print(f"Connected to inference worker pool at {_pool_address()}")
+
+    def close(self):
+        """
+        Release this client's result queue in the pool process
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.manager.release_result_queue(self.client_id)
+        except (ConnectionError, EOFError, OSError) as e:
+            print(f"Could not release worker pool result queue: {str(e)}")
+
+    def _read_results(self):
+        """
+        Background thread delivering pool results to waiting coroutines
+        """
+        while True:
+            result = self.results.get()
+            if result is None:
+                break  # Queue released
+            request_id, event, payload = result
+            entry = self.pending.get(request_id)
+            if entry is not None:
+                loop, events = entry
+                loop.call_soon_threadsafe(events.put_nowait, (event, payload))
+
+    async def _submit(self, kind: str, cancel: Optional[CancellationToken], **kwargs) -> Tuple[str, asyncio.Queue]:
+        """
+        Send request to the pool and register a queue for its events
+        """
+        if cancel is not None:
+            cancel.raise_if_cancelled()  # Deadline already passed while queued, don't occupy a worker
+            kwargs["timeout_seconds"] = cancel.remaining_seconds
+        loop = asyncio.get_event_loop()
+        request_id = uuid.uuid4().hex
+        events: asyncio.Queue = asyncio.Queue()
+        self.pending[request_id] = (loop, events)
+        # Proxy calls are blocking socket round-trips
+        await loop.run_in_executor(None, self.requests.put, (self.client_id, request_id, kind, kwargs))
+        return request_id, events
+
+    def _cancel_remote(self, request_id: str):
+        """
+        Tell the worker to stop generating (fire and forget)
+        """
+        asyncio.get_event_loop().run_in_executor(None, self.cancelled_requests.add, request_id)
+
+    async def _next_event(self, request_id: str, events: asyncio.Queue, cancel: Optional[CancellationToken]) -> tuple:
+        """
+        Wait for the next worker event, forwarding local cancellation to the worker
+        """
+        notified = False
+        while True:
+            try:
+                event, payload = await asyncio.wait_for(events.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                if cancel is not None and cancel.is_cancelled and not notified:
+                    self._cancel_remote(request_id)
+                    notified = True  # Keep waiting, the worker answers with a cancelled event
+                continue
+            if event == "error":
+                raise RuntimeError(payload)
+            if event == "cancelled":
+                raise GenerationCancelled(payload)
+            return event, payload
+
+    async def generate_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> str:
+        """
+        Asynchronous generate response method
+        """
+        request_id, events = await self._submit(
+            "generate",
+            cancel,
+            prompt=prompt,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k
+        )
+        finished = False
+        try:
+            _, (response, prompt_tokens, completion_tokens) = await self._next_event(request_id, events, cancel)
+            finished = True
+        except (RuntimeError, GenerationCancelled):
+            finished = True  # Worker already ended the request
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+            if not finished:
+                self._cancel_remote(request_id)
+        if usage is not None:
+            usage.add(prompt_tokens, completion_tokens)
+        return response
+
+    async def stream_response(
+        self,
+        prompt: str,
+        max_length: int = 1024,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        top_k: int = 50,
+        cancel: Optional[CancellationToken] = None,
+        usage: Optional[TokenUsage] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronous generator yielding text chunks produced by a pool worker
+        """
+        request_id, events = await self._submit(
+            "stream",
+            cancel,
+            prompt=prompt,
+            max_length=max_length,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k
+        )
+        finished = False
+        try:
+            while True:
+                event, payload = await self._next_event(request_id, events, cancel)
+                if event == "token":
+                    yield payload
+                else:
+                    finished = True
+                    if usage is not None:
+                        usage.add(payload[1], payload[2])
+                    break
+        except (RuntimeError, GenerationCancelled):
+            finished = True  # Worker already ended the request
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+            if not finished:
+                self._cancel_remote(request_id)
+
+if __name__ == "__main__":
+    serve_worker_pool()
\ No newline at end of file
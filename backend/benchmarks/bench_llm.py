@@ -0,0 +1,177 @@
+"""
+Offline benchmark of LLMService: prefill time, decode tokens/sec and peak RSS
+
+Usage: python -m benchmarks.bench_llm --prompt-lengths 32,128,512 --batch-sizes 1,4 --output llm.json
+Without --model-path a tiny random model is created, so it runs on any Linux box.
+"""
+import argparse  # CLI arguments
+import json  # Machine-readable results
+import os  # Environment for app settings
+import platform  # Host information
+import resource  # Peak RSS
+import statistics  # Medians
+import sys  # Output
+import time  # Timing
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark LLMService prefill/decode on CPU")
+    parser.add_argument("--model-path", help="Model directory (default: tiny random model)")
+    parser.add_argument("--tiny-model-dir", default="/tmp/tiny-llm", help="Where to create the tiny model")
+    parser.add_argument("--precision", help="Override LLM_PRECISION (float32, bfloat16, int8)")
+    parser.add_argument("--prompt-lengths", default="32,128,512", help="Comma separated prompt lengths in tokens")
+    parser.add_argument("--batch-sizes", default="1,4", help="Comma separated batch sizes")
+    parser.add_argument("--new-tokens", type=int, default=32, help="Tokens to decode per request")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per configuration (median is reported)")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def prompt_ids(tokenizer, length: int):
+    """
+    Token ids of filler text, exactly `length` long
+    """
+    filler = "I want to learn programming but I keep procrastinating, what should I do first? "
+    ids = tokenizer(filler, add_special_tokens=False)["input_ids"]
+    return (ids * (length // len(ids) + 1))[:length]
+
+def median_time(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def bench_configuration(service, length: int, batch_size: int, new_tokens: int, repeats: int) -> dict:
+    """
+    Measure one prompt length / batch size combination
+    """
+    import torch
+    from app.services.batching import BatchRequest, BatchScheduler
+
+    ids = prompt_ids(service.tokenizer, length)
+    input_ids = torch.tensor([ids] * batch_size, device=service.device)
+    attention_mask = torch.ones_like(input_ids)
+
+    def prefill():
+        with torch.no_grad():
+            service.model(input_ids=input_ids, attention_mask=attention_mask, use_cache=True)
+
+    def generate():
+        with torch.no_grad():
+            service.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens,  # Fixed amount of decode work
+                do_sample=False,
+                pad_token_id=service.tokenizer.pad_token_id
+            )
+
+    prefill()  # Warm-up run
+    prefill_seconds = median_time(prefill, repeats)
+    generate_seconds = median_time(generate, repeats)
+    decode_seconds = max(generate_seconds - prefill_seconds, 1e-9)
+
+    # Same prompts through the service's batched decode loop (system prompt cache included)
+    full_ids, prefix_cache = service._prepare_inputs(service.tokenizer.decode(ids), max_length=new_tokens)
+    scheduler = BatchScheduler(service, max_batch_size=batch_size, window_ms=0)
+    service_timings, service_tokens = [], []
+    for _ in range(repeats):
+        batch = [
+            BatchRequest(
+                input_ids=full_ids,
+                prefix_cache=prefix_cache,
+                max_new_tokens=new_tokens,
+                temperature=0,
+                top_p=1.0,
+                top_k=0
+            )
+            for _ in range(batch_size)
+        ]
+        start = time.perf_counter()
+        scheduler.run_batch(batch)
+        service_timings.append(time.perf_counter() - start)
+        service_tokens.append(sum(len(request.output_ids) for request in batch))
+    service_seconds = statistics.median(service_timings)
+
+    return {
+        "prompt_tokens": length,
+        "batch_size": batch_size,
+        "new_tokens": new_tokens,
+        "prefill_seconds": round(prefill_seconds, 4),
+        "prefill_tokens_per_second": round(length * batch_size / prefill_seconds, 1),
+        "decode_seconds": round(decode_seconds, 4),
+        "decode_tokens_per_second": round(new_tokens * batch_size / decode_seconds, 2),
+        "service_prompt_tokens": len(full_ids),
+        "service_seconds": round(service_seconds, 4),
+        "service_tokens_per_second": round(statistics.median(service_tokens) / service_seconds, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def main():
+    args = parse_args()
+
+    # Settings are read on the first import from app (creating the tiny model imports them too),
+    # so configure the environment before anything else
+    create_tiny = args.model_path is None
+    if create_tiny:
+        args.model_path = args.tiny_model_dir
+    os.environ["LLM_MODEL_PATH"] = args.model_path
+    os.environ.setdefault("LLM_SELF_CHECK", "false")
+    if args.precision:
+        os.environ["LLM_PRECISION"] = args.precision
+    if create_tiny:
+        from benchmarks.tiny_model import create_tiny_model
+        create_tiny_model(args.tiny_model_dir)
+
+    import torch
+    import transformers
+    from app.core.config import settings
+    from app.services.llm import LLMService, process_memory_mb
+
+    load_start = time.perf_counter()
+    service = LLMService()
+    load_seconds = time.perf_counter() - load_start
+
+    results = []
+    for length in [int(value) for value in args.prompt_lengths.split(",")]:
+        for batch_size in [int(value) for value in args.batch_sizes.split(",")]:
+            result = bench_configuration(service, length, batch_size, args.new_tokens, args.repeats)
+            print(json.dumps(result), file=sys.stderr)  # Progress
+            results.append(result)
+
+    report = {
+        "benchmark": "llm_offline",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "torch_threads": torch.get_num_threads(),
+        },
+        "config": {
+            "model_path": args.model_path,
+            "precision": settings.LLM_PRECISION,
+            "prefix_cache": settings.LLM_PREFIX_CACHE_ENABLED,
+            "repeats": args.repeats,
+        },
+        "load_seconds": round(load_seconds, 2),
+        "process_memory_mb": round(process_memory_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
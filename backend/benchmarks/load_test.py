@@ -0,0 +1,153 @@
+"""
+HTTP load generator for /auth/token, /users/me and /llm/generate
+
+Usage: python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 8 --requests 200 --output load.json
+Each scenario is reported separately with p50/p95/p99 latency, throughput and status counts.
+"""
+import argparse  # CLI arguments
+import asyncio  # Concurrent clients
+import json  # Machine-readable results
+import math  # Percentile ranks
+import sys  # Output
+import time  # Timing
+import uuid  # Unique load-test users
+import httpx  # Async HTTP client
+
+SCENARIOS = ("auth", "me", "generate")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the backend API")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Server address")
+    parser.add_argument("--api-prefix", default="/api/v1", help="API prefix")
+    parser.add_argument("--scenarios", default="auth,me,generate", help=f"Comma separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--users", type=int, default=8, help="Distinct users to spread requests over (per-user limits apply)")
+    parser.add_argument("--prompt", default="Give me one tip for staying focused.", help="Prompt for /llm/generate")
+    parser.add_argument("--max-length", type=int, default=64, help="max_length for /llm/generate")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+async def create_users(client: httpx.AsyncClient, prefix: str, count: int) -> list:
+    """
+    Register throwaway users and return (username, password, token) tuples
+    """
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    for index in range(count):
+        username, password = f"loadtest-{run_id}-{index}", uuid.uuid4().hex
+        response = await client.post(f"{prefix}/users/register", json={"username": username, "password": password})
+        response.raise_for_status()
+        token = await login(client, prefix, username, password)
+        users.append((username, password, token))
+    return users
+
+async def login(client: httpx.AsyncClient, prefix: str, username: str, password: str) -> str:
+    response = await client.post(f"{prefix}/auth/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+def scenario_request(scenario: str, args, prefix: str, user: tuple):
+    """
+    Build (method, url, kwargs) for one request of the scenario
+    """
+    username, password, token = user
+    if scenario == "auth":
+        return "POST", f"{prefix}/auth/token", {"data": {"username": username, "password": password}}
+    headers = {"Authorization": f"Bearer {token}"}
+    if scenario == "me":
+        return "GET", f"{prefix}/users/me", {"headers": headers}
+    return "POST", f"{prefix}/llm/generate", {
+        "headers": headers,
+        "json": {"prompt": args.prompt, "max_length": args.max_length},
+    }
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, args, prefix: str, users: list) -> dict:
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int):
+        method, url, kwargs = scenario_request(scenario, args, prefix, users[index % len(users)])
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+        statuses[status] = statuses.get(status, 0) + 1
+        if status.startswith("2"):
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(args.requests)))
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "status_counts": statuses,
+        "latency_seconds": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+async def run(args) -> dict:
+    prefix = args.api_prefix.rstrip("/")
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {scenario}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        users = await create_users(client, prefix, args.users)
+        results = []
+        for scenario in scenarios:
+            result = await run_scenario(client, scenario, args, prefix, users)
+            print(json.dumps(result), file=sys.stderr)  # Progress
+            results.append(result)
+
+    return {
+        "benchmark": "http_load",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "max_length": args.max_length,
+        },
+        "results": results,
+    }
+
+def main():
+    args = parse_args()
+    output = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Tiny randomly initialized stand-in for the real model, so benchmarks run without the weights
+
+Usage: python -m benchmarks.tiny_model /tmp/tiny-llm
+"""
+import argparse  # CLI arguments
+from pathlib import Path  # Path manipulation
+
+# Chat template tokens used by LLMService prompts
+SPECIAL_TOKENS = ["<pad>", "<eos>", "<bos>", "<unk>", "<start_of_turn>", "<end_of_turn>"]
+
+def build_tokenizer(vocab_size: int):
+    """
+    Train a small byte-level BPE tokenizer on the system prompt and some filler text
+    """
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast
+    from app.core.config import settings
+
+    corpus = [
+        settings.SYSTEM_PROMPT,
+        "How do I start learning programming? What's one small step you can take today?",
+        "I want to learn programming but I keep procrastinating.",
+    ] * 10
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=SPECIAL_TOKENS,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()  # Any text stays encodable
+    )
+    tokenizer.train_from_iterator(corpus, trainer=trainer)
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="<bos> $A",
+        special_tokens=[("<bos>", tokenizer.token_to_id("<bos>"))]
+    )
+
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<bos>",
+        eos_token="<eos>",
+        pad_token="<pad>",
+        unk_token="<unk>",
+        additional_special_tokens=["<start_of_turn>", "<end_of_turn>"],
+        padding_side="left"
+    )
+
+def create_tiny_model(output_dir: str, vocab_size: int = 2048, hidden_size: int = 128, layers: int = 2) -> str:
+    """
+    Save a tiny Llama-style model plus tokenizer in a directory usable as LLM_MODEL_PATH
+    """
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    output = Path(output_dir)
+    if (output / "config.json").exists():
+        return str(output)  # Already created
+    output.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = build_tokenizer(vocab_size)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 4,
+        num_hidden_layers=layers,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=8192,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+        tie_word_embeddings=True
+    )
+    torch.manual_seed(0)  # Same weights on every box
+    model = LlamaForCausalLM(config)
+
+    model.save_pretrained(output, safe_serialization=True)
+    tokenizer.save_pretrained(output)
+    return str(output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a tiny random model for benchmarks")
+    parser.add_argument("output_dir", help="Directory to write the model to")
+    parser.add_argument("--vocab-size", type=int, default=2048)
+    parser.add_argument("--hidden-size", type=int, default=128)
+    parser.add_argument("--layers", type=int, default=2)
+    args = parser.parse_args()
+    print(create_tiny_model(args.output_dir, args.vocab_size, args.hidden_size, args.layers))
@@ -1,13 +1,51 @@
-from fastapi import FastAPI, status  # FastAPI core and HTTP status codes
+from app.core.startup import startup_report  # Startup phase timing, imported first
+import time  # Import timing
+_imports_started = time.perf_counter()
+
+from contextlib import asynccontextmanager  # Lifespan handler
+from fastapi import FastAPI, Request, status  # FastAPI core and HTTP status codes
+from fastapi.concurrency import run_in_threadpool  # Schema creation off the event loop
 from fastapi.middleware.cors import CORSMiddleware  # CORS support
-from fastapi.responses import RedirectResponse  # URL redirects
+from fastapi.responses import JSONResponse, RedirectResponse  # URL redirects
 from app.core.config import settings  # App settings
-from app.api.v1 import auth, users, llm  # API route modules
-from app.db.base_class import Base  # SQLAlchemy Base class
-from app.db.session import engine  # Database engine
+from app.core.metrics import RequestLatencyMiddleware, metrics_response  # Prometheus metrics
+from app.api.v1 import auth, users, llm, conversations  # API route modules (no torch/transformers imports)
+from app.services.model_loader import close_llm_service, model_status, start_background_loading  # Model loading state
+from app.services.admission import AdmissionRejected  # Overload rejections
+from app.services.usage import get_usage_tracker  # Write-behind token accounting
+from app.services.history import get_history_writer  # Batched conversation history writes
+from app.db.init_db import init_db  # Schema creation
+from app.db.session import async_engine  # Closed on shutdown
+
+startup_report.add("imports", time.perf_counter() - _imports_started)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Explicit startup phases (timed) and shutdown flushing
+    """
+    if settings.DB_CREATE_SCHEMA:
+        with startup_report.phase("database schema"):
+            await run_in_threadpool(init_db)
+
+    # Periodically write token usage counters and conversation history to the database
+    with startup_report.phase("background writers"):
+        get_usage_tracker().start()
+        if settings.HISTORY_ENABLED:
+            get_history_writer().start()
 
-# Create database tables on startup
-Base.metadata.create_all(bind=engine)
+    # Load and warm up the model without blocking server startup
+    if settings.LLM_PRELOAD:
+        with startup_report.phase("model preload start"):
+            start_background_loading()
+
+    startup_report.log()
+    yield
+
+    await get_usage_tracker().stop()
+    await get_history_writer().stop()
+    close_llm_service()
+    await async_engine.dispose()  # Close pooled connections (aiosqlite keeps a thread per connection)
 
 # Initialize FastAPI app with OpenAPI config
 app = FastAPI(
@@ -17,6 +55,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
+    lifespan=lifespan,
 )
 
 # Setup CORS middleware
@@ -28,6 +67,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency
+app.add_middleware(RequestLatencyMiddleware)
+
+# Overloaded generation queue: fast 429/503 with a Retry-After estimate
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Root endpoint redirects to API docs
 @app.get("/", include_in_schema=False)
 async def root():
@@ -39,9 +90,28 @@ async def health_check():
     return {
         "status": "ok",
         "version": "1.0.0",
-        "api_version": "v1"
+        "api_version": "v1",
+        "model": model_status.state
     }
 
+# Readiness endpoint for load balancers: 200 only once the model is loaded and warmed up
+@app.get(f"{settings.API_V1_STR}/ready", tags=["health"])
+async def readiness_check():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if model_status.is_ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": model_status.is_ready, "model": model_status.to_dict()}
+    )
+
+# Time spent in each startup phase
+@app.get(f"{settings.API_V1_STR}/startup", tags=["health"])
+async def startup_phases():
+    return startup_report.to_dict()
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
 # Register API routers
 app.include_router(
     auth.router,
@@ -58,6 +128,11 @@ app.include_router(
     prefix=f"{settings.API_V1_STR}/llm",
     tags=["llm"]
 )
+app.include_router(
+    conversations.router,
+    prefix=f"{settings.API_V1_STR}/conversations",
+    tags=["conversations"]
+)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,64 @@
+"""
+Test setup: the app runs on the stub backend against a throwaway SQLite database
+
+Settings are read at import time, so the environment is set before anything from app is imported.
+Run from the backend directory: python -m pytest tests
+"""
+import os  # Test environment
+import sys  # Import path
+import tempfile  # Throwaway database directory
+import uuid  # Unique usernames
+
+_db_dir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update({
+    "SECRET_KEY": "test-secret-key",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_db_dir, 'test.db')}",
+    "ASYNC_DATABASE_URL": "",
+    "BCRYPT_ROUNDS": "4",  # Fast logins
+    "LLM_BACKEND": "stub",
+    "LLM_PRELOAD": "false",  # Loaded on first use, inside the test
+    "LLM_WARMUP_ENABLED": "false",
+    "LLM_WORKER_POOL_ENABLED": "false",
+    "LLM_BATCHING_ENABLED": "false",
+    "LLM_GENERATION_SLOTS": "1",
+    "LLM_CONTEXT_TOKENS": "4096",
+    "RESPONSE_CACHE_ENABLED": "false",
+    "USAGE_FLUSH_INTERVAL_SECONDS": "3600",  # Tests flush usage explicitly
+    "HISTORY_ENABLED": "true",
+    "HISTORY_FLUSH_INTERVAL_MS": "10",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # Fixtures
+from fastapi.testclient import TestClient  # In-process HTTP client
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    App with its lifespan running (schema creation, background writers)
+    """
+    from main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def user(client):
+    """
+    Newly registered user: dict with id, username and auth headers
+    """
+    username = f"user-{uuid.uuid4().hex[:12]}"
+    response = client.post("/api/v1/users/register", json={"username": username, "password": "secret"})
+    assert response.status_code == 200, response.text
+    token = client.post(
+        "/api/v1/auth/token",
+        data={"username": username, "password": "secret"}
+    ).json()["access_token"]
+    return {"id": response.json()["id"], "username": username, "headers": {"Authorization": f"Bearer {token}"}}
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory) -> str:
+    """
+    Tiny random Llama with tied embeddings (benchmarks.tiny_model) for transformers backend tests
+    """
+    from benchmarks.tiny_model import create_tiny_model
+    return create_tiny_model(str(tmp_path_factory.mktemp("tiny-llm")))
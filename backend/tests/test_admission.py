@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected, get_admission_controller
+
+def _controller(**overrides) -> AdmissionController:
+    options = {"slots": 1, "max_queue": 2, "per_user_limit": 2, "queue_timeout": 5}
+    options.update(overrides)
+    return AdmissionController(**options)
+
+def test_queued_requests_are_served_by_priority_then_fifo():
+    async def scenario():
+        controller = _controller(max_queue=3)
+        running = await controller.acquire(1)
+        served = []
+
+        async def wait(user_id: int, priority: str):
+            ticket = await controller.acquire(user_id, priority)
+            served.append(user_id)
+            ticket.release()
+
+        waiters = [
+            asyncio.create_task(wait(2, "batch")),
+            asyncio.create_task(wait(3, "interactive")),
+            asyncio.create_task(wait(4, "interactive")),
+        ]
+        await asyncio.sleep(0)
+        assert controller.queued == 3
+        running.release()
+        await asyncio.gather(*waiters)
+        return controller, served
+
+    controller, served = asyncio.run(scenario())
+    assert served == [3, 4, 2]
+    assert controller.active == 0 and controller.queued == 0
+    assert controller.user_requests == {}
+
+def test_full_queue_is_rejected_with_503():
+    async def scenario():
+        controller = _controller(max_queue=1)
+        running = await controller.acquire(1)
+        waiter = asyncio.create_task(controller.acquire(2))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(3)
+        running.release()
+        (await waiter).release()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.retry_after >= 1
+
+def test_per_user_limit_is_rejected_with_429():
+    async def scenario():
+        controller = _controller(slots=2, per_user_limit=1)
+        ticket = await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(1)
+        other = await controller.acquire(2)  # Other users are not affected
+        ticket.release()
+        other.release()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert controller.active == 0
+
+def test_queue_timeout_frees_the_waiter():
+    async def scenario():
+        controller = _controller(queue_timeout=0.05)
+        running = await controller.acquire(1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(2)
+        running.release()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert controller.timed_out == 1
+    assert controller.queued == 0 and controller.active == 0
+    assert controller.user_requests == {}
+
+def test_busy_api_answers_503_with_retry_after(client, user):
+    controller = _controller(max_queue=0)
+    client.app.dependency_overrides[get_admission_controller] = lambda: controller
+    try:
+        ticket = client.portal.call(controller.acquire, 0)  # Another request holds the only slot
+        response = client.post("/api/v1/llm/generate", json={"prompt": "Hello"}, headers=user["headers"])
+        ticket.release()
+    finally:
+        client.app.dependency_overrides.pop(get_admission_controller)
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert controller.active == 0
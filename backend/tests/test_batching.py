@@ -0,0 +1,31 @@
+import asyncio
+
+from app.core.config import settings
+from app.services.llm import LLMService
+
+# Different lengths, so the batch has to be left-padded
+PROMPTS = ["Hi!", "How do I start learning programming?", "I want to learn programming but I keep procrastinating."]
+
+def _service(monkeypatch, model_dir: str, batching: bool) -> LLMService:
+    monkeypatch.setattr(settings, "LLM_MODEL_PATH", model_dir)
+    monkeypatch.setattr(settings, "LLM_SPECULATIVE_MODE", "off")
+    monkeypatch.setattr(settings, "LLM_PREFIX_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_SELF_CHECK", False)
+    monkeypatch.setattr(settings, "LLM_BATCHING_ENABLED", batching)
+    monkeypatch.setattr(settings, "LLM_BATCH_WINDOW_MS", 200.0)  # Long enough to collect all prompts
+    return LLMService()
+
+def test_batched_greedy_output_matches_single_requests(monkeypatch, tiny_model_dir):
+    single = _service(monkeypatch, tiny_model_dir, batching=False)
+    expected = [asyncio.run(single.generate_response(prompt, max_length=24, temperature=0.0)) for prompt in PROMPTS]
+
+    batched = _service(monkeypatch, tiny_model_dir, batching=True)
+    batch_sizes = []
+    run_batch = batched.batch_scheduler.run_batch
+    monkeypatch.setattr(batched.batch_scheduler, "run_batch", lambda batch: batch_sizes.append(len(batch)) or run_batch(batch))
+
+    async def generate_together():
+        return await asyncio.gather(*(batched.generate_response(prompt, max_length=24, temperature=0.0) for prompt in PROMPTS))
+
+    assert asyncio.run(generate_together()) == expected
+    assert batch_sizes == [len(PROMPTS)]
@@ -0,0 +1,108 @@
+import base64
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.session import SessionLocal
+from app.models.conversation import Conversation, Message
+
+def _cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def _add_conversations(user_id: int, count: int) -> list:
+    """
+    Conversations written straight to the database; pairs share updated_at to exercise the id tie-break
+    """
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    rows = [
+        Conversation(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            title=f"conversation {i}",
+            created_at=base,
+            updated_at=base + timedelta(minutes=i // 2)
+        )
+        for i in range(count)
+    ]
+    with SessionLocal() as db:
+        db.add_all(rows)
+        db.commit()
+        return sorted(((row.updated_at, row.id) for row in rows), reverse=True)
+
+def _pages(client, user, url: str, limit: int) -> list:
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=user["headers"])
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= limit
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+def test_conversations_are_paged_newest_first(client, user):
+    expected = _add_conversations(user["id"], 7)
+    items = _pages(client, user, "/api/v1/conversations", limit=2)
+    assert [item["id"] for item in items] == [conversation_id for _, conversation_id in expected]
+
+def test_messages_are_paged_oldest_first(client, user):
+    (_, conversation_id), = _add_conversations(user["id"], 1)
+    with SessionLocal() as db:
+        db.add_all([Message(conversation_id=conversation_id, role="user", content=f"message {i}") for i in range(5)])
+        db.commit()
+
+    items = _pages(client, user, f"/api/v1/conversations/{conversation_id}/messages", limit=2)
+    assert [item["content"] for item in items] == [f"message {i}" for i in range(5)]
+
+def test_other_users_conversations_are_hidden(client, user):
+    (_, conversation_id), = _add_conversations(user["id"] + 1000, 1)
+    assert client.get("/api/v1/conversations", headers=user["headers"]).json()["items"] == []
+    response = client.get(f"/api/v1/conversations/{conversation_id}/messages", headers=user["headers"])
+    assert response.status_code == 404
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 !",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    _cursor(),
+    _cursor("2026-01-01T12:00:00"),
+    _cursor(1, 2),
+    _cursor("2026-01-01T12:00:00", 5),
+    _cursor("not a date", "abc"),
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+])
+def test_malformed_conversation_cursor_is_rejected(client, user, cursor):
+    response = client.get("/api/v1/conversations", params={"cursor": cursor}, headers=user["headers"])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+@pytest.mark.parametrize("cursor", [_cursor("5"), _cursor(1.5), _cursor(True), _cursor(1, 2), _cursor(None)])
+def test_malformed_message_cursor_is_rejected(client, user, cursor):
+    (_, conversation_id), = _add_conversations(user["id"], 1)
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        params={"cursor": cursor},
+        headers=user["headers"]
+    )
+    assert response.status_code == 400
+
+def test_generated_exchange_is_saved(client, user):
+    response = client.post("/api/v1/llm/generate", json={"prompt": "Remember me", "max_length": 64}, headers=user["headers"])
+    conversation_id = response.json()["conversation_id"]
+
+    # History is written behind the request, wait for the batch
+    deadline = time.monotonic() + 5
+    items = []
+    while time.monotonic() < deadline:
+        items = client.get(f"/api/v1/conversations/{conversation_id}/messages", headers=user["headers"]).json().get("items", [])
+        if len(items) == 2:
+            break
+        time.sleep(0.05)
+    assert [(item["role"], item["content"]) for item in items] == [
+        ("user", "Remember me"),
+        ("model", response.json()["response"]),
+    ]
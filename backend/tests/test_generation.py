@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from app.services.backends.stub import StubBackend
+from app.services.cancellation import CancellationToken
+from app.services.model_loader import get_llm_service
+
+def _sse_events(body: str) -> list:
+    """
+    (event, data) pairs of a Server-Sent Events body
+    """
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+def test_generate(client, user):
+    response = client.post("/api/v1/llm/generate", json={"prompt": "Hello", "max_length": 64}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    assert "Stub answer" in response.json()["response"]
+
+    # Same prompt, same answer
+    again = client.post("/api/v1/llm/generate", json={"prompt": "Hello", "max_length": 64}, headers=user["headers"])
+    assert again.json()["response"] == response.json()["response"]
+
+def test_stream_ends_with_end_event(client, user):
+    with client.stream("POST", "/api/v1/llm/generate/stream", json={"prompt": "Hello", "max_length": 64}, headers=user["headers"]) as response:
+        assert response.status_code == 200
+        body = "".join(response.iter_text())
+
+    events = _sse_events(body)
+    assert [event for event, _ in events if event != "message"] == ["end"]
+    text = "".join(data["token"] for event, data in events if event == "message")
+    assert text.startswith("Stub answer")
+
+def test_completed_stream_is_not_cancelled(client):
+    llm = get_llm_service()
+    cancel = CancellationToken()
+
+    async def consume():
+        return [chunk async for chunk in llm.stream_response("Hello", max_length=64, cancel=cancel)]
+
+    chunks = asyncio.run(consume())
+    assert "".join(chunks).startswith("Stub answer")
+    assert not cancel.is_cancelled
+
+def test_stopped_stream_is_cancelled(client):
+    llm = StubBackend()
+    llm.step_delay = 0.05  # Still decoding when the consumer stops
+    cancel = CancellationToken()
+
+    async def consume_first_chunk():
+        stream = llm.stream_response("Hello", max_length=64, cancel=cancel)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.2)  # Let the decode thread see the cancellation before the loop closes
+
+    asyncio.run(consume_first_chunk())
+    assert cancel.is_cancelled
+    assert cancel.reason == "stream consumer stopped"
+
+def test_generate_requires_auth(client):
+    response = client.post("/api/v1/llm/generate", json={"prompt": "Hello"})
+    assert response.status_code == 401
@@ -0,0 +1,27 @@
+from prometheus_client import REGISTRY
+
+def _request_count(method: str, route_suffix: str, status: str) -> float:
+    """
+    Requests recorded for a route template (with or without its router prefix, depending on the FastAPI version)
+    """
+    return sum(
+        sample.value
+        for metric in REGISTRY.collect() if metric.name == "http_request_duration_seconds"
+        for sample in metric.samples
+        if sample.name.endswith("_count")
+        and sample.labels["method"] == method
+        and sample.labels["route"].endswith(route_suffix)
+        and sample.labels["status"] == status
+    )
+
+def test_latency_is_labelled_by_route_template(client, user):
+    before = _request_count("GET", "/sessions/{session_id}", "404")
+    response = client.get("/api/v1/llm/sessions/no-such-session", headers=user["headers"])
+    assert response.status_code == 404
+    assert _request_count("GET", "/sessions/{session_id}", "404") == before + 1
+
+def test_unknown_paths_share_one_label(client):
+    before = _request_count("GET", "unmatched", "404")
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+    assert _request_count("GET", "unmatched", "404") == before + 2
@@ -0,0 +1,23 @@
+import pytest
+import torch
+from transformers import AutoModelForCausalLM
+
+from app.services.llm import PRECISION_DTYPES, export_mmap_weights, load_mmap_model
+
+@pytest.mark.parametrize("precision", ["float32", "bfloat16"])
+def test_mmap_model_matches_pretrained(tiny_model_dir, precision):
+    weights_path = export_mmap_weights(tiny_model_dir, precision)
+    model = load_mmap_model(tiny_model_dir, weights_path, PRECISION_DTYPES[precision])
+    reference = AutoModelForCausalLM.from_pretrained(
+        tiny_model_dir,
+        torch_dtype=PRECISION_DTYPES[precision],
+        local_files_only=True
+    )
+
+    # The file stores tied embeddings once, both names must end up on the same mapped tensor
+    assert model.get_output_embeddings().weight.data_ptr() == model.get_input_embeddings().weight.data_ptr()
+    assert all(param.device.type == "cpu" for param in model.parameters())
+
+    input_ids = torch.tensor([[5, 6, 7, 8, 9]])
+    with torch.no_grad():
+        assert torch.equal(model(input_ids).logits, reference(input_ids).logits)
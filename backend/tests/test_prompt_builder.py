@@ -0,0 +1,46 @@
+from app.services.backends.stub import ByteTokenizer
+from app.services.prompt_builder import PromptBuilder
+
+SYSTEM_PROMPT = "You are a test mentor."
+
+def _builder(context_tokens: int) -> PromptBuilder:
+    return PromptBuilder(ByteTokenizer(), lambda: SYSTEM_PROMPT, context_tokens)
+
+def test_short_prompt_is_kept_whole():
+    builder = _builder(1024)
+    built = builder.build("How do I start?", max_new_tokens=100)
+    assert built.trimmed_tokens == 0
+    assert built.user_tokens == len("How do I start?")
+    assert built.input_ids[:built.system_tokens] == builder.prefix_ids()
+
+def test_long_prompt_is_trimmed_in_the_middle():
+    builder = _builder(300)
+    prompt = "START " + "x" * 1000 + " END"
+    built = builder.build(prompt, max_new_tokens=100)
+
+    assert built.prompt_tokens <= builder.input_budget(100)
+    assert built.trimmed_tokens == len(prompt) - built.user_tokens
+    assert built.input_ids[:built.system_tokens] == builder.prefix_ids()  # System prompt is never trimmed
+    user_text = ByteTokenizer().decode(built.input_ids[built.system_tokens:built.system_tokens + built.user_tokens])
+    assert user_text.startswith("START") and user_text.endswith("END")
+
+def test_chat_drops_oldest_exchanges_first():
+    builder = _builder(400)
+    history = [(f"question {i} " + "q" * 40, f"answer {i} " + "a" * 40) for i in range(6)]
+    built = builder.build_chat(history, "latest question", max_new_tokens=100)
+
+    assert built.prompt_tokens <= builder.input_budget(100)
+    assert built.user_tokens == len("latest question")
+    assert built.history_tokens > 0 and built.trimmed_tokens > 0
+    text = ByteTokenizer().decode(built.input_ids)
+    assert "question 5" in text and "question 0" not in text
+    kept = [i for i in range(6) if f"question {i}" in text]
+    assert kept == list(range(kept[0], 6))  # A contiguous run of the newest exchanges
+
+def test_no_room_left_keeps_only_the_system_prompt():
+    prefix_length = len(_builder(1024).prefix_ids())
+    builder = _builder(prefix_length + 60)
+    built = builder.build("some user text", max_new_tokens=50)
+    assert built.user_tokens == 0
+    assert built.trimmed_tokens == len("some user text")
+    assert built.input_ids[:built.system_tokens] == builder.prefix_ids()
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from app.services.sessions import SessionStore
+
+class FakeTensor:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+    def numel(self) -> int:
+        return self.nbytes
+
+    def element_size(self) -> int:
+        return 1
+
+def _cache(nbytes: int):
+    """
+    Stand-in for a transformers cache holding nbytes of keys and values
+    """
+    return SimpleNamespace(layers=[SimpleNamespace(keys=FakeTensor(nbytes // 2), values=FakeTensor(nbytes // 2))])
+
+def _store(**overrides) -> SessionStore:
+    options = {
+        "cache_budget_bytes": 1000,
+        "cache_idle_seconds": 600,
+        "session_ttl_seconds": 3600,
+        "max_sessions": 100,
+        "max_sessions_per_user": 10,
+    }
+    options.update(overrides)
+    return SessionStore(**options)
+
+def _cached_bytes(store: SessionStore) -> int:
+    return sum(session.cache_bytes for session in store.sessions.values())
+
+def test_cache_bytes_follow_stored_caches():
+    store = _store()
+    first, second = store.create(1), store.create(1)
+    store.store_cache(first, [1, 2], _cache(300))
+    store.store_cache(second, [3], _cache(200))
+    assert store.cache_bytes == 500 == _cached_bytes(store)
+
+    store.store_cache(first, [1, 2, 3], _cache(400))  # Replaces the old cache
+    assert store.cache_bytes == 600 == _cached_bytes(store)
+
+    store.delete(second)
+    assert store.cache_bytes == 400 == _cached_bytes(store)
+
+def test_least_recently_used_cache_is_evicted_over_budget():
+    store = _store()
+    first, second = store.create(1), store.create(1)
+    store.store_cache(first, [1], _cache(600))
+    store.store_cache(second, [2], _cache(600))
+
+    assert first.cache is None and second.cache is not None
+    assert store.cache_evictions == 1
+    assert store.cache_bytes == 600 == _cached_bytes(store)
+
+def test_cache_larger_than_budget_is_not_kept():
+    store = _store()
+    session = store.create(1)
+    store.store_cache(session, [1], _cache(2000))
+    assert session.cache is None
+    assert store.cache_bytes == 0
+
+def test_cache_of_deleted_session_is_not_counted():
+    store = _store()
+    session = store.create(1)
+    store.store_cache(session, [1], _cache(300))
+    store.delete(session)
+
+    # A turn that was running while the session got deleted finishes afterwards
+    store.store_cache(session, [1, 2], _cache(400))
+    assert session.cache is None
+    assert store.cache_bytes == 0
+
+def test_cache_of_evicted_session_is_not_counted():
+    store = _store(max_sessions=1)
+    session = store.create(1)
+    store.create(2)  # Pushes the first session out
+    store.store_cache(session, [1], _cache(300))
+    assert session.cache is None
+    assert store.cache_bytes == 0
+
+def test_user_at_the_limit_replaces_their_oldest_session():
+    store = _store(max_sessions_per_user=2)
+    other = store.create(2)
+    oldest, newer = store.create(1), store.create(1)
+    store.store_cache(oldest, [1], _cache(300))
+    newest = store.create(1)
+
+    assert store.get(oldest.id, 1) is None
+    assert store.get(newer.id, 1) is newer and store.get(newest.id, 1) is newest
+    assert store.get(other.id, 2) is other
+    assert store.cache_bytes == 0
+
+def test_chat_session_api(client, user):
+    session_id = client.post("/api/v1/llm/sessions", headers=user["headers"]).json()["session_id"]
+    url = f"/api/v1/llm/sessions/{session_id}"
+
+    response = client.post(f"{url}/messages", json={"message": "Hi", "max_length": 64}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    messages = client.get(url, headers=user["headers"]).json()["messages"]
+    assert [message["role"] for message in messages] == ["user", "model"]
+
+    assert client.delete(url, headers=user["headers"]).status_code == 204
+    assert client.get(url, headers=user["headers"]).status_code == 404
+    assert client.post(f"{url}/messages", json={"message": "Hi"}, headers=user["headers"]).status_code == 404
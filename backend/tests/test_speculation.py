@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm import LLMService
+from app.services.sessions import SessionStore
+
+PROMPTS = ["How do I start learning programming?", "I keep procrastinating, what's one small step?"]
+
+def _service(monkeypatch, model_dir: str, mode: str) -> LLMService:
+    monkeypatch.setattr(settings, "LLM_MODEL_PATH", model_dir)
+    monkeypatch.setattr(settings, "LLM_DRAFT_MODEL_PATH", model_dir)  # Identical draft, every candidate matches
+    monkeypatch.setattr(settings, "LLM_SPECULATIVE_MODE", mode)
+    monkeypatch.setattr(settings, "LLM_PREFIX_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_SELF_CHECK", False)
+    return LLMService()
+
+def _chat(service: LLMService) -> list:
+    store = SessionStore(1 << 30, 3600, 3600, 10, 10)
+    session = store.create(user_id=1)
+    return [
+        asyncio.run(service.generate_chat_turn(session, store, message, max_length=24, temperature=0.0))
+        for message in PROMPTS
+    ]
+
+def _outputs(service: LLMService) -> tuple:
+    responses = [asyncio.run(service.generate_response(prompt, max_length=24, temperature=0.0)) for prompt in PROMPTS]
+    return responses, _chat(service)
+
+@pytest.fixture(scope="module")
+def greedy_outputs(tiny_model_dir):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        return _outputs(_service(monkeypatch, tiny_model_dir, "off"))
+
+@pytest.mark.parametrize("mode", ["draft", "prompt_lookup"])
+def test_speculation_keeps_greedy_output(monkeypatch, tiny_model_dir, greedy_outputs, mode):
+    service = _service(monkeypatch, tiny_model_dir, mode)
+    assert _outputs(service) == greedy_outputs
+
+def test_identical_draft_is_always_accepted(monkeypatch, tiny_model_dir):
+    service = _service(monkeypatch, tiny_model_dir, "draft")
+    asyncio.run(service.generate_response(PROMPTS[0], max_length=24, temperature=0.0))
+    stats = service.speculation_stats()
+    assert stats["candidate_tokens"] > 0
+    assert stats["acceptance_rate"] > 0.9
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from app.services.backends.base import TokenLoopBackend
+from app.services.backends.stub import ByteTokenizer
+
+class FixedLogitsBackend(TokenLoopBackend):
+    """
+    Same next-token logits at every step: a few favourite bytes, so an unconstrained decode just loops
+    """
+    def __init__(self):
+        tokenizer = ByteTokenizer()
+        super().__init__(tokenizer, [tokenizer.eos_token_id], 1024)
+        self.logits = np.full(tokenizer.vocab_size, -10.0)
+        self.logits[[ord("a"), ord("b"), ord("c"), ord("d")]] = [10.0, 9.0, 8.0, 7.0]
+
+    def _prefill(self, input_ids):
+        return None, self.logits
+
+    def _forward(self, state, token_id):
+        return None, self.logits
+
+def _trigrams(ids: list) -> list:
+    return [tuple(ids[i:i + 3]) for i in range(len(ids) - 2)]
+
+@pytest.mark.parametrize("temperature", [0.0, 0.7])
+def test_no_trigram_repeats(temperature):
+    backend = FixedLogitsBackend()
+    input_ids = list(b"abcab")
+    output_ids = backend._generate_sync(input_ids, 40, temperature, 0.95, 50)
+
+    assert len(output_ids) == 40
+    trigrams = _trigrams(input_ids + output_ids)
+    assert len(trigrams) == len(set(trigrams))  # Including the ones already in the prompt
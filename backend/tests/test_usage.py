@@ -0,0 +1,42 @@
+from app.db.session import SessionLocal
+from app.models.usage import Usage
+from app.services.usage import get_usage_tracker
+
+def _stored_usage(user_id: int):
+    with SessionLocal() as db:
+        return db.query(Usage).filter(Usage.user_id == user_id).first()
+
+def test_usage_is_counted_in_memory_and_written_on_flush(client, user):
+    for prompt in ("First prompt", "Second prompt"):
+        response = client.post("/api/v1/llm/generate", json={"prompt": prompt, "max_length": 64}, headers=user["headers"])
+        assert response.status_code == 200, response.text
+
+    stats = client.get("/api/v1/llm/usage", headers=user["headers"]).json()
+    assert stats["requests"] == 2
+    assert stats["prompt_tokens"] > 0 and stats["completion_tokens"] > 0
+    assert _stored_usage(user["id"]) is None  # Nothing written on the request path
+
+    client.portal.call(get_usage_tracker().flush)
+    row = _stored_usage(user["id"])
+    assert (row.prompt_tokens, row.completion_tokens, row.requests) == (
+        stats["prompt_tokens"], stats["completion_tokens"], stats["requests"]
+    )
+
+    # Totals are reloaded from the database after the flush and keep counting from there
+    client.post("/api/v1/llm/generate", json={"prompt": "Third prompt", "max_length": 64}, headers=user["headers"])
+    assert client.get("/api/v1/llm/usage", headers=user["headers"]).json()["requests"] == 3
+    client.portal.call(get_usage_tracker().flush)
+    assert _stored_usage(user["id"]).requests == 3
+
+def test_daily_quota_rejects_with_429(client, user):
+    tracker = get_usage_tracker()
+    client.post("/api/v1/llm/generate", json={"prompt": "Use some tokens", "max_length": 64}, headers=user["headers"])
+    used = client.get("/api/v1/llm/usage", headers=user["headers"]).json()["total_tokens"]
+
+    tracker.daily_quota = used
+    try:
+        response = client.post("/api/v1/llm/generate", json={"prompt": "One more", "max_length": 64}, headers=user["headers"])
+    finally:
+        tracker.daily_quota = 0
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
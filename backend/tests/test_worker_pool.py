@@ -0,0 +1,75 @@
+import asyncio
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.cancellation import CancellationToken, GenerationCancelled
+from app.services.worker_pool import CancelledRequests, RemoteCancellationToken, WorkerPoolClient
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def pool_client():
+    """
+    Client of a one-worker stub pool running in its own process
+    """
+    port, authkey = _free_port(), secrets.token_hex(16)
+    env = dict(os.environ, LLM_WORKER_POOL_PORT=str(port), LLM_WORKER_POOL_AUTHKEY=authkey, LLM_WORKER_POOL_SIZE="1")
+    server = subprocess.Popen([sys.executable, "-m", "app.services.worker_pool"], cwd=BACKEND_DIR, env=env)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "LLM_WORKER_POOL_PORT", port)
+        monkeypatch.setattr(settings, "LLM_WORKER_POOL_AUTHKEY", authkey)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    assert time.monotonic() < deadline and server.poll() is None, "worker pool did not start"
+                    time.sleep(0.1)
+            client = WorkerPoolClient()
+            yield client
+            client.close()
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+def test_zero_timeout_is_already_due():
+    assert CancellationToken(0.0).is_cancelled
+    assert CancellationToken(None).remaining_seconds is None
+
+def test_expired_request_is_not_forwarded(pool_client):
+    cancel = CancellationToken(0.0)
+    with pytest.raises(GenerationCancelled, match="deadline exceeded"):
+        asyncio.run(pool_client.generate_response("Hello", max_length=64, cancel=cancel))
+    assert not pool_client.pending
+
+def test_expired_stream_is_not_forwarded(pool_client):
+    async def consume():
+        return [chunk async for chunk in pool_client.stream_response("Hello", max_length=64, cancel=CancellationToken(0.0))]
+
+    with pytest.raises(GenerationCancelled, match="deadline exceeded"):
+        asyncio.run(consume())
+    assert not pool_client.pending
+
+def test_request_with_time_left_is_answered(pool_client):
+    response = asyncio.run(pool_client.generate_response("Hello", max_length=64, cancel=CancellationToken(30.0)))
+    assert "Stub answer" in response
+
+def test_worker_honours_an_exhausted_deadline():
+    # The client forwards remaining_seconds, which is 0.0 once the deadline has passed
+    cancel = RemoteCancellationToken(CancelledRequests(), "request-id", 0.0)
+    assert cancel.is_cancelled
+    assert cancel.reason == "deadline exceeded"